@@ -0,0 +1,119 @@
+# analysis_pipeline.py
+# Runs the single-company analysis fetches as a dependency graph,
+# with independent stages in parallel, and records per-stage timings.
+
+import os
+import threading
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from finance_utils import get_stock_info, get_peg_ratio, get_analyst_price_targets, classify_valuation
+from price_history import get_price_series, latest_close
+from benchmark_engine import get_benchmark_metrics
+from peer_index import rank_company
+from news_utils import get_company_news_finnhub, summarize_news_articles
+from gpt_summary import generate_summary
+
+# Set ANALYST_PIPELINE_DEBUG=1 to log per-stage timings for every analysis
+PIPELINE_DEBUG = os.environ.get("ANALYST_PIPELINE_DEBUG") == "1"
+
+
+def run_stages(stages, max_workers=8):
+    """
+    Execute a graph of stages. `stages` maps name -> (fn, dependencies); each fn
+    is called with a dict holding the results of its dependencies.
+    A failed stage yields None for its dependents and is listed in `errors`.
+    Returns (results, timings, errors).
+    """
+    results, timings, errors = {}, {}, {}
+    remaining = dict(stages)
+    running = {}
+
+    # Let worker threads use st.cache_data and friends like the script thread does
+    ctx = get_script_run_ctx()
+
+    def timed(name, fn, inputs):
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        started = time.perf_counter()
+        try:
+            return fn(inputs), None
+        except Exception as e:
+            return None, str(e)
+        finally:
+            timings[name] = round(time.perf_counter() - started, 3)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while remaining or running:
+            for name, (fn, deps) in list(remaining.items()):
+                if all(dep in results for dep in deps):
+                    inputs = {dep: results[dep] for dep in deps}
+                    running[pool.submit(timed, name, fn, inputs)] = name
+                    del remaining[name]
+
+            if not running:
+                raise ValueError(f"Unresolvable stage dependencies: {sorted(remaining)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name], error = future.result()
+                if error is not None:
+                    errors[name] = error
+
+    return results, timings, errors
+
+
+def _summarize_news(news_list):
+    if not isinstance(news_list, list):
+        return []
+    return summarize_news_articles([item for item in news_list[:5] if isinstance(item, dict)])
+
+
+def run_company_analysis(ticker, time_range, include_summary=True):
+    """
+    Fetch everything the analysis page shows for one ticker.
+    The critical path is news -> news summaries -> AI summary; every other
+    fetch runs alongside it. With include_summary=False the AI summary stage
+    is skipped so the caller can stream it instead.
+    """
+    stages = {
+        "data": (lambda _: get_stock_info(ticker), []),
+        "price_frame": (lambda _: get_price_series(ticker, time_range), []),
+        "peg": (lambda _: get_peg_ratio(ticker), []),
+        "targets": (lambda _: get_analyst_price_targets(ticker), []),
+        "news": (lambda _: get_company_news_finnhub(ticker), []),
+        "benchmark": (lambda r: get_benchmark_metrics((r["data"] or {}).get("sector", "Unknown")), ["data"]),
+        "peer_ranks": (lambda _: rank_company(ticker), ["data"]),
+        "news_summaries": (lambda r: _summarize_news(r["news"]), ["news"]),
+        "valuation_label": (
+            lambda r: classify_valuation(latest_close(r["price_frame"]), r["targets"]),
+            ["price_frame", "targets"],
+        ),
+        "ai_summary": (
+            lambda r: generate_summary(
+                r["data"] or {},
+                valuation_label=r["valuation_label"],
+                news_summaries=r["news_summaries"],
+            ),
+            ["data", "valuation_label", "news_summaries"],
+        ),
+    }
+
+    if not include_summary:
+        del stages["ai_summary"]
+
+    started = time.perf_counter()
+    results, timings, errors = run_stages(stages)
+    timings["total"] = round(time.perf_counter() - started, 3)
+    if PIPELINE_DEBUG:
+        print(f"[PIPELINE] {ticker} stage timings: {timings}")
+
+    if results["price_frame"] is None:
+        results["price_frame"] = pd.DataFrame()
+    results["closing_price"] = latest_close(results["price_frame"])
+    results["timings"] = timings
+    results["errors"] = errors
+    return results
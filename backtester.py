@@ -0,0 +1,182 @@
+# backtester.py
+# Historical backtest of a target-weight portfolio over an adjusted-close matrix.
+# Between rebalances the share counts are fixed, so each holding simply tracks
+# its price relative to the last rebalance. That lets calendar rebalancing be
+# computed for the whole date range at once; threshold rebalancing steps from
+# one rebalance to the next instead of from day to day.
+
+import numpy as np
+import pandas as pd
+from benchmark_etfs import benchmark_map
+from price_history import get_close_matrix
+from utils import format_number
+
+TRADING_DAYS = 252
+DEFAULT_COST_BPS = 10.0  # Commission plus spread, per unit of traded value
+DEFAULT_THRESHOLD = 0.05  # Rebalance when any weight drifts this far from target
+DEFAULT_BENCHMARK = "SPY"
+THRESHOLD_LOOKAHEAD = 63  # Days scanned per step when searching for the next breach
+
+REBALANCE_RULES = {
+    "none": "Buy and hold",
+    "monthly": "Monthly",
+    "quarterly": "Quarterly",
+    "annual": "Annually",
+    "threshold": "When a weight drifts 5 points",
+}
+CALENDAR_PERIODS = {"monthly": "M", "quarterly": "Q", "annual": "Y"}
+
+
+def benchmark_choices():
+    """SPY first, then the sector ETFs, without repeats."""
+    return list(dict.fromkeys([DEFAULT_BENCHMARK] + list(benchmark_map.values())))
+
+
+def _calendar_rebalances(dates, rule):
+    """Row of the last trading day of every period except the one that ends the backtest."""
+    naive = dates.tz_localize(None) if dates.tz is not None else dates
+    periods = naive.to_period(CALENDAR_PERIODS[rule])
+    period_ends = np.flatnonzero(periods[1:] != periods[:-1])
+    return np.concatenate([[0], period_ends[period_ends > 0]])
+
+
+def _threshold_rebalances(prices, weights, threshold):
+    """Walk from rebalance to rebalance, scanning ahead in blocks for the first breach."""
+    rebalances = [0]
+    start, last = 0, len(prices) - 1
+    while start < last:
+        scan_from = start + 1
+        breach = None
+        while scan_from <= last and breach is None:
+            block = prices[scan_from:scan_from + THRESHOLD_LOOKAHEAD] / prices[start]
+            drifted = block * weights
+            drifted /= drifted.sum(axis=1, keepdims=True)
+            breached = np.flatnonzero((np.abs(drifted - weights) > threshold).any(axis=1))
+            if breached.size:
+                breach = scan_from + breached[0]
+            scan_from += THRESHOLD_LOOKAHEAD
+        if breach is None or breach >= last:
+            break
+        rebalances.append(breach)
+        start = breach
+    return np.asarray(rebalances)
+
+
+def backtest(closes, weights, rebalance="none", threshold=DEFAULT_THRESHOLD, cost_bps=DEFAULT_COST_BPS, capital=10_000):
+    """
+    Backtest target `weights` (Series by ticker) over `closes` (dates x tickers).
+    Holdings with no prices at all are left out and the remaining weights
+    rescaled. The portfolio is bought at the first close where every other
+    holding has a price and rebalanced back to target at the close of each
+    rebalance day, paying cost_bps on the traded value.
+    Returns a dict with the daily "equity" curve, "rebalance_dates", "turnover"
+    (one-way, per rebalance), "annual_turnover", "costs" (USD),
+    "contributions" (each holding's P&L as a share of starting capital) and
+    "excluded" (tickers left out).
+    """
+    weights = weights[weights > 0]
+    prices_frame = closes.reindex(columns=weights.index)
+    excluded = [t for t in weights.index if prices_frame[t].isna().all()]
+    weights = weights.drop(excluded)
+    prices_frame = prices_frame[weights.index].ffill().dropna(how="any")
+    if len(prices_frame) < 2:
+        return None
+
+    dates = prices_frame.index
+    prices = prices_frame.to_numpy(dtype="float64")
+    w = weights.to_numpy(dtype="float64")
+    w = w / w.sum()
+
+    if rebalance == "none":
+        starts = np.array([0])
+    elif rebalance == "threshold":
+        starts = _threshold_rebalances(prices, w, threshold)
+    else:
+        starts = _calendar_rebalances(dates, rebalance)
+
+    # Segment k holds fixed shares from the close of starts[k] to the close of starts[k + 1]
+    days = np.arange(len(dates))
+    segment = np.maximum(np.searchsorted(starts, days, side="left") - 1, 0)
+    growth = prices / prices[starts[segment]]  # Price relative to the segment's start
+    segment_growth = growth @ w
+
+    ends = np.append(starts[1:], len(dates) - 1)
+    end_growth = growth[ends]  # (segments x holdings)
+    drifted = end_growth * w
+    drifted /= drifted.sum(axis=1, keepdims=True)
+
+    # Trades at each rebalance: the initial purchase, then drifted weights back to target
+    traded = np.concatenate([[1.0], np.abs(w - drifted[:-1]).sum(axis=1)])
+    cost_rate = traded * cost_bps / 10_000
+    invested = capital * np.cumprod(np.concatenate([[1.0], segment_growth[ends[:-1]]]) * (1 - cost_rate))
+
+    equity = invested[segment] * segment_growth
+    equity[0] = invested[0]
+
+    # P&L per holding inside each segment, summed over segments
+    pnl = (invested[:, None] * w * (end_growth - 1)).sum(axis=0)
+    before_trade = np.concatenate([[capital], invested[:-1] * segment_growth[ends[:-1]]])
+    costs = float((before_trade * cost_rate).sum())
+
+    years = max((dates[-1] - dates[0]).days / 365.25, 1 / TRADING_DAYS)
+    turnover = pd.Series(traded[1:] / 2, index=dates[starts[1:]], dtype="float64")
+
+    return {
+        "equity": pd.Series(equity, index=dates, name="Portfolio"),
+        "rebalance_dates": dates[starts[1:]],
+        "turnover": turnover,
+        "annual_turnover": float(turnover.sum() / years),
+        "costs": costs,
+        "contributions": pd.Series(pnl / capital, index=weights.index, name="Contribution"),
+        "excluded": excluded,
+    }
+
+
+def performance_metrics(equity):
+    """Total return, CAGR, annualized volatility and max drawdown of an equity curve."""
+    values = equity.to_numpy(dtype="float64")
+    daily = values[1:] / values[:-1] - 1
+    years = max((equity.index[-1] - equity.index[0]).days / 365.25, 1 / TRADING_DAYS)
+    peaks = np.maximum.accumulate(values)
+    return {
+        "Total Return": values[-1] / values[0] - 1,
+        "CAGR": (values[-1] / values[0]) ** (1 / years) - 1,
+        "Volatility": daily.std(ddof=1) * np.sqrt(TRADING_DAYS) if len(daily) > 1 else np.nan,
+        "Max Drawdown": (1 - values / peaks).max(),
+    }
+
+
+def run_backtest(weights, period="5y", rebalance="none", benchmark=DEFAULT_BENCHMARK,
+                 threshold=DEFAULT_THRESHOLD, cost_bps=DEFAULT_COST_BPS, capital=10_000):
+    """
+    Backtest a portfolio and a buy-and-hold benchmark ETF from one bulk download.
+    Returns the backtest dict plus "benchmark" (equity curve over the same dates)
+    and "metrics" (DataFrame, one column each), or None without enough data.
+    """
+    weights = pd.Series(weights, dtype="float64")
+    weights.index = [t.strip().upper() for t in weights.index]
+    weights = weights.groupby(level=0).sum()
+
+    closes = get_close_matrix(list(weights.index) + [benchmark], period)
+    if closes.empty:
+        return None
+    result = backtest(closes, weights, rebalance, threshold, cost_bps, capital)
+    if result is None:
+        return None
+
+    equity = result["equity"]
+    benchmark_prices = closes[benchmark].reindex(equity.index).ffill().bfill()
+    metrics = {"Portfolio": performance_metrics(equity)}
+    if benchmark_prices.notna().all():
+        result["benchmark"] = (capital * benchmark_prices / benchmark_prices.iloc[0]).rename(benchmark)
+        metrics[benchmark] = performance_metrics(result["benchmark"])
+    else:
+        result["benchmark"] = None
+
+    result["metrics"] = pd.DataFrame(metrics)
+    return result
+
+
+def format_backtest_metrics(metrics):
+    """Presentation copy of the metrics table."""
+    return metrics.apply(lambda column: column.map(lambda x: format_number(None if pd.isna(x) else float(x), style="percent")))
@@ -0,0 +1,137 @@
+# batch_export.py
+# Word reports for a whole watchlist, delivered as one ZIP.
+# Company data is gathered for several tickers at once on threads (the work is
+# network-bound); charts and documents are built in a small process pool,
+# since matplotlib and python-docx hold the GIL. Pool workers only import
+# docx_exporter. Each finished document is written straight into a ZIP
+# backed by a SpooledTemporaryFile, and only a bounded number of documents are
+# in flight, so building the ZIP does not hold the whole watchlist in memory.
+
+import csv
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from analysis_pipeline import run_company_analysis
+from docx_exporter import CHART_MAX_POINTS, build_report, build_report_job
+from price_history import DEFAULT_TIME_RANGE, downsample_bars
+from utils import clean_company_name, clean_text
+
+GATHER_WORKERS = 4  # Tickers analyzed at once; each analysis runs its own stage threads
+MAX_BUILD_WORKERS = 2  # Spawning a process costs more than a report below this
+MAX_PENDING_DOCUMENTS = 8  # Documents built but not yet written to the ZIP
+SPOOL_MAX_BYTES = 32 * 1024 * 1024  # The ZIP moves from memory to disk beyond this
+
+
+def _gather_report(ticker, time_range):
+    """Everything one report needs, as plain picklable values for a worker process."""
+    analysis = run_company_analysis(ticker, time_range)
+    data = analysis["data"]
+    if not data:
+        raise ValueError("Company data not available")
+
+    chart_data = analysis["price_frame"]
+    if not chart_data.empty and "Close" in chart_data.columns:
+        chart_data = downsample_bars(chart_data[["Close"]], max_points=CHART_MAX_POINTS)
+    else:
+        chart_data = None
+
+    report = {
+        "data": data,
+        "closing_price": analysis["closing_price"],
+        "peg": analysis["peg"],
+        "benchmark": analysis["benchmark"],
+        "targets": analysis["targets"],
+        "valuation_label": analysis["valuation_label"],
+        "ai_summary": clean_text(analysis.get("ai_summary") or "").strip(),
+    }
+    title = f"{clean_company_name(data.get('shortName') or ticker)} Stock Price ({time_range})"
+    return ticker, chart_data, title, report
+
+
+def export_watchlist(tickers, time_range=DEFAULT_TIME_RANGE, workers=None, progress=None):
+    """
+    Build a report for every ticker and stream them into one ZIP, together
+    with a status.csv listing each ticker's outcome.
+    progress(done, total, ticker) is called as each ticker finishes.
+    Returns (archive, statuses): archive is a file object positioned at the
+    start of the ZIP, to be closed by the caller; statuses maps ticker ->
+    "OK" or the error message.
+    """
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    statuses = {}
+    archive = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+
+    # Let gather threads use st.cache_data and friends like the script thread does
+    ctx = get_script_run_ctx()
+
+    def gather(ticker):
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return _gather_report(ticker, time_range)
+
+    def finish(ticker, status):
+        statuses[ticker] = status
+        if progress is not None:
+            progress(len(statuses), len(tickers), ticker)
+
+    workers = min(workers or MAX_BUILD_WORKERS, os.cpu_count() or 1, max(len(tickers), 1))
+    pool = None
+    if workers > 1:
+        # Spawned workers start clean instead of forking the Streamlit server
+        context = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(workers, mp_context=context)
+
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+
+        def write(ticker, build):
+            try:
+                _, document = build()
+                bundle.writestr(f"{ticker}_financial_report.docx", document)
+                finish(ticker, "OK")
+            except Exception as e:
+                finish(ticker, f"Report failed: {e}")
+
+        def write_finished(building):
+            done, _ = wait(building, return_when=FIRST_COMPLETED)
+            for future in done:
+                write(building.pop(future), future.result)
+
+        try:
+            building = {}
+            with ThreadPoolExecutor(max_workers=GATHER_WORKERS) as threads:
+                gathering = {threads.submit(gather, ticker): ticker for ticker in tickers}
+                for future in as_completed(gathering):
+                    ticker = gathering[future]
+                    try:
+                        job = future.result()
+                    except Exception as e:
+                        finish(ticker, f"Data failed: {e}")
+                        continue
+
+                    if pool is None:
+                        write(ticker, lambda: build_report(*job))
+                        continue
+                    building[pool.submit(build_report_job, job)] = ticker
+                    if len(building) >= MAX_PENDING_DOCUMENTS:
+                        write_finished(building)
+
+            while building:
+                write_finished(building)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        status_file = io.StringIO()
+        writer = csv.writer(status_file)
+        writer.writerow(["Ticker", "Status"])
+        writer.writerows((ticker, statuses.get(ticker, "Not exported")) for ticker in tickers)
+        bundle.writestr("status.csv", status_file.getvalue())
+
+    archive.seek(0)
+    return archive, statuses
@@ -1,47 +1,71 @@
 # benchmark_engine.py
 
-import yfinance as yf
-from benchmark_etfs import benchmark_map, SP500_SECTOR_WEIGHTS
+from market_data import get_ticker_info
+from benchmark_etfs import benchmark_map
+from universe import get_sp500_sector_weights, get_sector_baseline
 import streamlit as st
+import pandas as pd
 from utils import format_number
 
 @st.cache_data(ttl=3600)
-def get_benchmark_metrics(sector):
+def _etf_benchmark_metrics(sector):
     etf_ticker = benchmark_map.get(sector, "SPY")
-    etf = yf.Ticker(etf_ticker)
-    info = etf.info
+    info = get_ticker_info(etf_ticker, groups=("profile", "market"))
 
     return {
         "Benchmark": etf_ticker,
         "Name": info.get("shortName", etf_ticker),
         "PE": format_number(info.get("trailingPE"), style="ratio"),
         "PB": format_number(info.get("priceToBook"), style="ratio"),
-        "ROE": format_number(info.get("returnOnEquity"), style="percent")
+        "ROE": format_number(info.get("returnOnEquity"), style="percent"),
+        "Source": "etf",
 }
 
 
+def _format_range(stats, style):
+    if stats["q1"] is None or stats["q3"] is None:
+        return "N/A"
+    return f"{format_number(stats['q1'], style=style)} - {format_number(stats['q3'], style=style)}"
+
+
+def get_benchmark_metrics(sector):
+    """
+    Sector medians (and interquartile ranges) across the S&P 500 universe,
+    read from the stored baselines. Falls back to the sector ETF's own
+    ratios while no baseline has been computed for the sector.
+    """
+    baseline = get_sector_baseline(sector)
+    if not baseline:
+        return _etf_benchmark_metrics(sector)
+
+    metrics = {
+        "Benchmark": "sector median",
+        "Name": f"S&P 500 {sector}, {baseline['count']} companies",
+        "Source": "universe",
+    }
+    for metric, style in (("PE", "ratio"), ("PB", "ratio"), ("ROE", "percent")):
+        metrics[metric] = format_number(baseline[metric]["median"], style=style)
+        metrics[f"{metric} Range"] = _format_range(baseline[metric], style)
+    return metrics
+
+
 def compare_sector_allocation(portfolio_sector_weights):
-    insights = []
-
-    for sector, port_weight in portfolio_sector_weights.items():
-        # Handle string percentages like "28.1%"
-        if isinstance(port_weight, str):
-            port_weight = port_weight.replace("%", "").strip()
-            try:
-                port_weight = float(port_weight)
-            except ValueError:
-                port_weight = 0.0  # fallback if it can't be converted
-
-        benchmark_weight = SP500_SECTOR_WEIGHTS.get(sector, 0.0)
-        diff = port_weight - benchmark_weight
-
-        if diff > 5:
-            insights.append(f"Overexposed to {sector} (+{diff:.1f}% vs S&P 500)")
-        elif diff < -5:
-            insights.append(f"Underexposed to {sector} ({diff:.1f}% vs S&P 500)")
-
-    if not insights:
+    """
+    Compare portfolio sector weights (numeric percentages, e.g. 28.1) with the
+    live S&P 500 sector weights and flag sectors more than 5 points away.
+    """
+    portfolio = pd.Series(portfolio_sector_weights, dtype="float64").fillna(0.0)
+    benchmark = get_sp500_sector_weights().reindex(portfolio.index, fill_value=0.0)
+    diff = portfolio - benchmark
+
+    flagged = diff[diff.abs() > 5]
+    labels = flagged.index.to_series()
+    insights = (
+        ("Overexposed to " + labels + " (+" + flagged.map("{:.1f}".format) + "% vs S&P 500)")
+        .where(flagged > 0, "Underexposed to " + labels + " (" + flagged.map("{:.1f}".format) + "% vs S&P 500)")
+    )
+
+    if insights.empty:
         return "Your sector allocation closely matches the S&P 500 benchmark."
     
     return " | ".join(insights)
-
@@ -10,24 +10,26 @@ benchmark_map = {
     "Energy": "XLE",
     "Industrials": "XLI",
     "Materials": "XLB",
+    "Basic Materials": "XLB",   # Yahoo's label for Materials
     "Real Estate": "XLRE",
     "Utilities": "XLU",
     "Communication Services": "XLC",
     "Broad Market": "SPY"       # Fallback
 }
 
-# Portfolio builder insight (Must change to live data later)
+# Fallback for universe.get_sp500_sector_weights until live weights have been computed.
+# Keys are Yahoo sector names, as reported in `info["sector"]`.
 
 SP500_SECTOR_WEIGHTS = {
     "Technology": 28.1,
     "Healthcare": 13.0,
-    "Financials": 11.0,
+    "Financial Services": 11.0,
     "Consumer Cyclical": 10.5,
     "Communication Services": 8.8,
     "Industrials": 7.9,
     "Consumer Defensive": 6.6,
     "Energy": 4.4,
     "Utilities": 2.6,
-    "Materials": 2.5,
+    "Basic Materials": 2.5,
     "Real Estate": 2.3
 }
\ No newline at end of file
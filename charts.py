@@ -1,38 +1,30 @@
-import yfinance as yf
 import plotly.graph_objects as go
 import streamlit as st
+from price_history import CHART_RANGES, DEFAULT_TIME_RANGE, downsample_bars
+from backtester import format_backtest_metrics
+from monte_carlo import SIMULATION_METHODS
+from utils import format_number, render_metric
 
-def display_stock_price_chart(ticker, clean_name):
+def display_stock_price_chart(ticker, clean_name, price_frame):
+    """
+    Plot the selected range from the render's shared daily price frame.
+    The range selector is keyed in session state, so main.py knows the
+    range to load before this widget is drawn.
+    """
     st.subheader("Stock Price Chart")
 
     # Let user select time range with session state persistence
     if "time_range" not in st.session_state:
-        st.session_state.time_range = "1Y"
+        st.session_state.time_range = DEFAULT_TIME_RANGE
 
-    st.session_state.time_range = st.selectbox(
-        "Select time range",
-        ["1M", "6M", "1Y", "5Y", "YTD", "MAX"],
-        index=["1M", "6M", "1Y", "5Y", "YTD", "MAX"].index(st.session_state.time_range)
-    )
+    st.selectbox("Select time range", list(CHART_RANGES), key="time_range")
 
     # Assign local variable for convenience
     time_range = st.session_state.time_range
 
-    # Mapping for yfinance period/intervals
-    range_map = {
-        "1M": ("1mo", "1d"),
-        "6M": ("6mo", "1d"),
-        "1Y": ("1y", "1d"),
-        "5Y": ("5y", "1wk"),
-        "YTD": ("ytd", "1d"),
-        "MAX": ("max", "1mo"),
-    }
-
-    selected_period, selected_interval = range_map[time_range]
-
     try:
-        stock = yf.Ticker(ticker)
-        hist_data = stock.history(period=selected_period, interval=selected_interval)
+        # Never send the browser more points than the chart has pixels
+        hist_data = downsample_bars(price_frame)
 
         if hist_data.empty:
             st.warning("Historical price data not available.")
@@ -59,3 +51,110 @@ def display_stock_price_chart(ticker, clean_name):
 
     except Exception as e:
         st.error(f"Error fetching historical chart: {e}")
+
+
+def display_efficient_frontier(frontier, point):
+    """Plot the efficient frontier and mark the portfolio picked from it."""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=frontier["Volatility"],
+        y=frontier["Return"],
+        mode="lines+markers",
+        name="Efficient Frontier",
+        line=dict(color="royalblue", width=2)
+    ))
+    fig.add_trace(go.Scatter(
+        x=[frontier["Volatility"].iloc[point]],
+        y=[frontier["Return"].iloc[point]],
+        mode="markers",
+        name="Selected Portfolio",
+        marker=dict(color="crimson", size=12)
+    ))
+
+    fig.update_layout(
+        title="Efficient Frontier",
+        xaxis_title="Expected Volatility (annualized)",
+        yaxis_title="Expected Return (annualized)",
+        xaxis_tickformat=".0%",
+        yaxis_tickformat=".0%",
+        template="plotly_white",
+        height=400,
+    )
+
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def display_projection_bands(bands, capital):
+    """Plot Monte Carlo percentile bands of portfolio value by year."""
+    years = bands.index / 12
+
+    fig = go.Figure()
+    for low, high, opacity in (("P5", "P95", 0.15), ("P25", "P75", 0.3)):
+        fig.add_trace(go.Scatter(x=years, y=bands[high], mode="lines", line=dict(width=0), showlegend=False, hoverinfo="skip"))
+        fig.add_trace(go.Scatter(
+            x=years,
+            y=bands[low],
+            mode="lines",
+            line=dict(width=0),
+            fill="tonexty",
+            fillcolor=f"rgba(65, 105, 225, {opacity})",
+            name=f"{low[1:]}th-{high[1:]}th percentile"
+        ))
+    fig.add_trace(go.Scatter(x=years, y=bands["P50"], name="Median", line=dict(color="royalblue", width=2)))
+    fig.add_hline(y=capital, line_dash="dot", line_color="gray")
+
+    fig.update_layout(
+        title="Projected Portfolio Value",
+        xaxis_title="Years",
+        yaxis_title="Value (USD)",
+        template="plotly_white",
+        height=450,
+    )
+
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def display_projection(projection, capital):
+    """Summary line, percentile metrics and bands of a simulate_portfolio result."""
+    st.markdown(
+        f"Based on {projection['paths']:,} simulated paths over {projection['years']} years "
+        f"({SIMULATION_METHODS[projection['method']].lower()}, monthly steps). "
+        f"Past returns drive the simulation and are not a forecast."
+    )
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        render_metric("Median value", format_number(projection["terminal"][50], style="usd"))
+    with col2:
+        render_metric("5th-95th percentile", f"{format_number(projection['terminal'][5], style='usd')} - {format_number(projection['terminal'][95], style='usd')}")
+    with col3:
+        render_metric("Chance of a loss", format_number(projection["probability_of_loss"], style="percent"))
+    display_projection_bands(projection["bands"], capital)
+
+
+def display_backtest(result, rule_label):
+    """Show a run_backtest result: metrics against the benchmark, equity curves and contributions."""
+    st.markdown(
+        f"Rebalancing: **{rule_label}**. {len(result['rebalance_dates'])} rebalances, "
+        f"{format_number(result['annual_turnover'], style='percent')} annual turnover, "
+        f"{format_number(result['costs'], style='usd')} in transaction costs."
+    )
+    st.dataframe(format_backtest_metrics(result["metrics"]))
+
+    equity, benchmark = result["equity"], result["benchmark"]
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=equity.index, y=equity, name="Portfolio", line=dict(color="royalblue", width=2)))
+    if benchmark is not None:
+        fig.add_trace(go.Scatter(x=benchmark.index, y=benchmark, name=benchmark.name, line=dict(color="gray", width=1.5)))
+
+    fig.update_layout(
+        title="Backtest: Growth of Starting Capital",
+        xaxis_title="Date",
+        yaxis_title="Value (USD)",
+        template="plotly_white",
+        height=450,
+    )
+
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.markdown("Contribution to return by holding")
+    st.bar_chart(result["contributions"].sort_values(ascending=False))
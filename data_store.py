@@ -0,0 +1,209 @@
+# data_store.py
+# Local SQLite store shared by every Streamlit session, rerun and process.
+# Point ANALYST_DATA_DIR at a shared volume so all app replicas use one store.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DATA_DIR = os.environ.get("ANALYST_DATA_DIR", "data")
+DB_PATH = os.path.join(DATA_DIR, "analyst_store.sqlite")
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS fundamentals (
+        ticker TEXT NOT NULL,
+        field_group TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        fetched_at REAL NOT NULL,
+        PRIMARY KEY (ticker, field_group)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS price_history_meta (
+        ticker TEXT NOT NULL,
+        interval TEXT NOT NULL,
+        covered_from REAL,
+        checked_at REAL NOT NULL,
+        PRIMARY KEY (ticker, interval)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS llm_responses (
+        cache_key TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        response TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        last_used REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS llm_responses_last_used ON llm_responses (last_used)",
+    """
+    CREATE TABLE IF NOT EXISTS news_articles (
+        ticker TEXT NOT NULL,
+        article_key TEXT NOT NULL,
+        published_at REAL NOT NULL,
+        payload TEXT NOT NULL,
+        PRIMARY KEY (ticker, article_key)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS news_articles_recent ON news_articles (ticker, published_at)",
+    """
+    CREATE TABLE IF NOT EXISTS news_fetch_meta (
+        ticker TEXT PRIMARY KEY,
+        checked_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS datasets (
+        name TEXT PRIMARY KEY,
+        payload TEXT NOT NULL,
+        computed_at REAL NOT NULL
+    )
+    """,
+)
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+def get_connection():
+    """
+    Return this thread's SQLite connection, creating the database on first use.
+    WAL mode lets readers in other sessions and processes run while one writes.
+    """
+    global _schema_ready
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+
+    if not _schema_ready:
+        with _schema_lock:
+            if not _schema_ready:
+                for statement in _SCHEMA:
+                    conn.execute(statement)
+                conn.commit()
+                _schema_ready = True
+    return conn
+
+
+# ========== Fundamentals ==========
+
+def read_fundamentals(ticker, groups):
+    """
+    Return {group: (payload, fetched_at)} for the stored field groups of a ticker.
+    Groups that were never stored are simply absent.
+    """
+    groups = list(groups)
+    if not groups:
+        return {}
+    placeholders = ",".join("?" for _ in groups)
+    rows = get_connection().execute(
+        f"SELECT field_group, payload, fetched_at FROM fundamentals "
+        f"WHERE ticker = ? AND field_group IN ({placeholders})",
+        [ticker, *groups],
+    ).fetchall()
+    return {group: (json.loads(payload), fetched_at) for group, payload, fetched_at in rows}
+
+
+def write_fundamentals(ticker, payloads, fetched_at=None):
+    """Store {group: payload} for a ticker, replacing older copies of those groups."""
+    fetched_at = fetched_at or time.time()
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO fundamentals (ticker, field_group, payload, fetched_at) "
+            "VALUES (?, ?, ?, ?)",
+            [(ticker, group, json.dumps(payload, default=str), fetched_at) for group, payload in payloads.items()],
+        )
+
+
+# ========== Price history bookkeeping ==========
+
+def read_price_history_meta(ticker, interval):
+    """
+    Return (covered_from, checked_at) for a stored price series, or None.
+    covered_from is the earliest epoch second the series covers (None = full history).
+    """
+    return get_connection().execute(
+        "SELECT covered_from, checked_at FROM price_history_meta WHERE ticker = ? AND interval = ?",
+        (ticker, interval),
+    ).fetchone()
+
+
+def write_price_history_meta(ticker, interval, covered_from, checked_at=None):
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO price_history_meta (ticker, interval, covered_from, checked_at) "
+            "VALUES (?, ?, ?, ?)",
+            (ticker, interval, covered_from, checked_at or time.time()),
+        )
+
+
+# ========== News ==========
+
+def read_news(ticker, limit, since=0):
+    """
+    Return (articles, newest_published_at, checked_at) for a ticker's stored news.
+    Articles are newest first and limited to those published at or after `since`;
+    newest_published_at covers every stored article, whatever its age.
+    """
+    conn = get_connection()
+    rows = conn.execute(
+        "SELECT payload FROM news_articles WHERE ticker = ? AND published_at >= ? "
+        "ORDER BY published_at DESC LIMIT ?",
+        (ticker, since, limit),
+    ).fetchall()
+    newest = conn.execute("SELECT MAX(published_at) FROM news_articles WHERE ticker = ?", (ticker,)).fetchone()[0]
+    meta = conn.execute("SELECT checked_at FROM news_fetch_meta WHERE ticker = ?", (ticker,)).fetchone()
+    articles = [json.loads(payload) for (payload,) in rows]
+    return articles, newest, meta[0] if meta else None
+
+
+def write_news(ticker, articles, keep, checked_at=None):
+    """
+    Add (article_key, published_at, payload) rows for a ticker, ignoring ones already
+    stored, and keep only its `keep` most recent articles.
+    """
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO news_articles (ticker, article_key, published_at, payload) VALUES (?, ?, ?, ?)",
+            [(ticker, key, published_at, json.dumps(payload)) for key, published_at, payload in articles],
+        )
+        conn.execute(
+            "DELETE FROM news_articles WHERE ticker = ? AND article_key NOT IN ("
+            "SELECT article_key FROM news_articles WHERE ticker = ? ORDER BY published_at DESC LIMIT ?)",
+            (ticker, ticker, keep),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO news_fetch_meta (ticker, checked_at) VALUES (?, ?)",
+            (ticker, checked_at or time.time()),
+        )
+
+
+# ========== Computed datasets ==========
+
+def read_dataset(name):
+    """Return (payload, computed_at) for a dataset computed over the universe, or None."""
+    row = get_connection().execute(
+        "SELECT payload, computed_at FROM datasets WHERE name = ?", (name,)
+    ).fetchone()
+    return (json.loads(row[0]), row[1]) if row else None
+
+
+def write_dataset(name, payload, computed_at=None):
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO datasets (name, payload, computed_at) VALUES (?, ?, ?)",
+            (name, json.dumps(payload, default=str), computed_at or time.time()),
+        )
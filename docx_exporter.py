@@ -1,11 +1,18 @@
 # -*- coding: utf-8 -*-
 # docx_exporter.py
+# Word report and its chart image. Imports only python-docx, matplotlib and
+# formatting helpers, so process-pool workers that build reports start quickly.
 
 from docx import Document
 from docx.shared import Inches
-from utils import format_number, clean_text
+from matplotlib.figure import Figure
+from formatting import format_number, clean_text
 import io
 
+CHART_SIZE_INCHES = (10, 4)
+CHART_DPI = 150
+CHART_MAX_POINTS = CHART_SIZE_INCHES[0] * CHART_DPI  # Image width in pixels
+
 def generate_word_report(
     data,
     ticker,
@@ -61,7 +68,7 @@ def generate_word_report(
         doc.add_heading("Sector Benchmark Comparison", level=1)
 
         paragraph = doc.add_paragraph()
-        run_etf = paragraph.add_run("ETF: ")
+        run_etf = paragraph.add_run("ETF: " if benchmark.get("Source") == "etf" else "Benchmark: ")
         run_etf.bold = True
         paragraph.add_run(f"{benchmark['Name']} ({benchmark['Benchmark']})")
 
@@ -136,3 +143,44 @@ def generate_word_report(
             doc.add_paragraph(f"Chart could not be added due to an error: {e}")
 
     return doc
+
+
+def render_price_chart(chart_data, title):
+    """
+    PNG bytes of the closing-price chart. Callers downsample `chart_data` to
+    CHART_MAX_POINTS first. Draws on a standalone Figure rather than pyplot,
+    so no figure is left behind in matplotlib's global state between sessions.
+    """
+    fig = Figure(figsize=CHART_SIZE_INCHES)
+    ax = fig.subplots()
+    ax.plot(chart_data.index, chart_data["Close"], label="Close Price", linewidth=2)
+    ax.set_title(title)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Price (USD)")
+    ax.grid(True)
+    ax.legend()
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight", dpi=CHART_DPI)
+    return buffer.getvalue()
+
+
+def build_report(ticker, chart_data, chart_title, report):
+    """
+    (PNG bytes or None, DOCX bytes) for one report. `report` holds the
+    generate_word_report arguments other than ticker and chart_image.
+    """
+    png = None
+    if chart_data is not None and not chart_data.empty and "Close" in chart_data.columns:
+        png = render_price_chart(chart_data, chart_title)
+
+    doc = generate_word_report(ticker=ticker, chart_image=io.BytesIO(png) if png else None, **report)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return png, buffer.getvalue()
+
+
+def build_report_job(job):
+    """Process-pool entry point: build_report for a (ticker, chart_data, chart_title, report) tuple."""
+    return build_report(*job)
@@ -1,10 +1,12 @@
 import yfinance as yf  # This lets us get financial data from the internet
 import random  # This is used to randomly select stocks
+from market_data import get_ticker_info, fetch_info_batch  # Shared per-ticker info snapshot
+from price_history import get_price_history  # Local OHLCV store
+from upstream_scheduler import call, BATCH  # Shared upstream queues and budgets
 
 # Gets general financial data for a company
 def get_stock_info(ticker):
-    stock = yf.Ticker(ticker)
-    info = stock.info
+    info = get_ticker_info(ticker, groups=("profile", "market"))
 
     return {
         "shortName": info.get("shortName"),
@@ -25,8 +27,7 @@ def get_stock_info(ticker):
 # Gets recent revenue history (quarterly)
 def get_revenue_history(ticker):
     try:
-        stock = yf.Ticker(ticker)
-        income_stmt = stock.quarterly_financials
+        income_stmt = call("yahoo", lambda: yf.Ticker(ticker).quarterly_financials)
         if "Total Revenue" not in income_stmt.index:
             return None
         revenue_series = income_stmt.loc["Total Revenue"]
@@ -37,35 +38,53 @@ def get_revenue_history(ticker):
 # Gets the most recent closing price
 def get_closing_price(ticker):
     try:
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period="1d")
+        hist = get_price_history(ticker, "1d")
         if not hist.empty:
             return hist["Close"].iloc[-1]
     except Exception:
         return None
 
-# Gets analyst price targets
+# Gets analyst price targets (None when no analyst covers the stock)
 def get_analyst_price_targets(ticker):
     try:
-        stock = yf.Ticker(ticker)
-        recs = stock.recommendations
-        if recs is not None and not recs.empty:
-            info = stock.info
-            return {
-                "targetLow": info.get("targetLowPrice"),
-                "targetHigh": info.get("targetHighPrice"),
-                "targetMean": info.get("targetMeanPrice"),
-                "targetMedian": info.get("targetMedianPrice")
-            }
-        return None
+        info = get_ticker_info(ticker, groups=("targets",))
+        targets = {
+            "targetLow": info.get("targetLowPrice"),
+            "targetHigh": info.get("targetHighPrice"),
+            "targetMean": info.get("targetMeanPrice"),
+            "targetMedian": info.get("targetMedianPrice")
+        }
+        if all(value is None for value in targets.values()):
+            return None
+        return targets
     except Exception:
         return None
 
+# Places the current price within the analyst target range
+def classify_valuation(closing_price, targets):
+    if not targets or not closing_price:
+        return None
+    try:
+        low = float(targets.get("targetLow", 0))
+        mean = float(targets.get("targetMean", 0))
+        high = float(targets.get("targetHigh", 0))
+    except (TypeError, ValueError):
+        return None
+
+    if closing_price < low:
+        return "undervalued"
+    elif low <= closing_price < mean:
+        return "fairly valued"
+    elif mean <= closing_price <= high:
+        return "slightly overvalued"
+    elif closing_price > high:
+        return "overvalued"
+    return "unclear"
+
 # Calculates PEG Ratio using forward PE and 5-year earnings growth estimate
 def get_peg_ratio(ticker):
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        info = get_ticker_info(ticker, groups=("market",))
 
         peg = info.get("trailingPegRatio", None)  # Use the available key
         print(f"[PEG DEBUG] Raw PEG from Yahoo: {peg}")
@@ -78,8 +97,7 @@ def get_peg_ratio(ticker):
 
 def get_sp500_tickers_from_etf():
     try:
-        spy = yf.Ticker("SPY")
-        holdings = spy.fund_holdings
+        holdings = call("yahoo", lambda: yf.Ticker("SPY").fund_holdings, key=("fund_holdings", "SPY"), priority=BATCH)
         if holdings is not None and not holdings.empty:
             return holdings["Symbol"].tolist()
     except:
@@ -91,26 +109,46 @@ def get_sp500_tickers_from_etf():
         "PFE", "VZ", "ABBV", "T", "MRK", "META", "INTC", "CRM", "NFLX", "QCOM"
     ]
 
-def get_stocks_by_risk_profile(risk_level, limit):
+def classify_by_beta(tickers, max_workers=16):
     """
-    Dynamically fetch stocks from SPY ETF and classify by beta.
+    Split tickers into Low / Medium / High beta buckets.
+    Info is fetched concurrently at batch priority, so it yields to interactive
+    analysis; tickers that fail or have no beta are skipped.
+    Returns (classified, stats).
     """
-    sp500_tickers = get_sp500_tickers_from_etf()
+    infos, failures, stats = fetch_info_batch(tickers, max_workers=max_workers, priority=BATCH)
     classified = {"Low": [], "Medium": [], "High": []}
 
-    for ticker in sp500_tickers:
-        try:
-            info = yf.Ticker(ticker).info
-            beta = info.get("beta")
-            if beta is None:
-                continue
-            if beta < 0.9:
-                classified["Low"].append(ticker)
-            elif 0.9 <= beta <= 1.3:
-                classified["Medium"].append(ticker)
-            else:
-                classified["High"].append(ticker)
-        except:
+    for ticker, info in infos.items():
+        beta = info.get("beta")
+        if not isinstance(beta, (int, float)):
             continue
+        if beta < 0.9:
+            classified["Low"].append(ticker)
+        elif 0.9 <= beta <= 1.3:
+            classified["Medium"].append(ticker)
+        else:
+            classified["High"].append(ticker)
 
-    return random.sample(classified.get(risk_level, []), k=min(limit, len(classified.get(risk_level, []))))
\ No newline at end of file
+    stats["classified"] = sum(len(bucket) for bucket in classified.values())
+    stats["failures"] = failures
+    return classified, stats
+
+def get_risk_universe(risk_level):
+    """
+    Every S&P 500 name whose beta falls in the risk level's bucket, sorted.
+    """
+    sp500_tickers = get_sp500_tickers_from_etf()
+    classified, stats = classify_by_beta(sp500_tickers)
+    print(
+        f"[SCREENER] {stats['classified']}/{stats['requested']} classified, "
+        f"{stats['failed']} failed in {stats['elapsed_seconds']}s"
+    )
+    return sorted(classified.get(risk_level, []))
+
+def get_stocks_by_risk_profile(risk_level, limit):
+    """
+    Dynamically fetch stocks from SPY ETF and classify by beta.
+    """
+    universe = get_risk_universe(risk_level)
+    return random.sample(universe, k=min(limit, len(universe)))
@@ -0,0 +1,24 @@
+# formatting.py
+# Plain-text formatting helpers with no app dependencies, shared by the UI and
+# the report workers.
+
+def format_number(value, style="usd"):
+    if value is None:
+        return "N/A"
+
+    try:
+        if style == "usd":
+            return f"${round(value, 2):,}" if isinstance(value, (int, float)) else value
+        elif style == "percent":
+            return f"{round(value * 100, 2)}%" if isinstance(value, (int, float)) else value
+        elif style == "ratio":
+            return f"{round(value, 2)}" if isinstance(value, (int, float)) else value
+        else:
+            return str(value)
+    except:
+        return "N/A"
+
+
+# === Clean text of special characters (for GPT or online data) ===
+def clean_text(text):
+    return text.encode("utf-8", "ignore").decode("utf-8", "ignore")
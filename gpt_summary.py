@@ -1,6 +1,7 @@
 import streamlit as st
 from openai import OpenAI
-from utils import format_number
+from utils import format_number, clean_text
+from llm_cache import cached_completion, cached_completion_stream
 
 # Initialize OpenAI client with your Streamlit secret key
 client = OpenAI(api_key=st.secrets["openai_api_key"])
@@ -8,7 +9,7 @@ client = OpenAI(api_key=st.secrets["openai_api_key"])
 # ---------------------------------------
 # Generate GPT summary for one company
 # ---------------------------------------
-def generate_summary(data, valuation_label=None, news_summaries=None):
+def _build_summary_messages(data, valuation_label=None, news_summaries=None):
     news_insight = ""
     if news_summaries:
         top_news = "\n".join(f"- {item}" for item in news_summaries[:5])
@@ -68,19 +69,39 @@ End the report with this exact line on its own line:
 {news_insight}
 """
 
+    return [
+        {"role": "system", "content": "You are a helpful and professional financial analyst."},
+        {"role": "user", "content": prompt}
+    ]
+
+def generate_summary(data, valuation_label=None, news_summaries=None):
     try:
-        response = client.chat.completions.create(
+        return cached_completion(
+            client,
             model="gpt-3.5-turbo",
             temperature=0.3,
-            messages=[
-                {"role": "system", "content": "You are a helpful and professional financial analyst."},
-                {"role": "user", "content": prompt}
-            ]
+            messages=_build_summary_messages(data, valuation_label, news_summaries)
         )
-        return response.choices[0].message.content.strip()
     except Exception as e:
         return f"Error generating summary: {e}"
 
+# ---------------------------------------------------------------
+# Same summary, yielded token by token as the completion streams
+# (the caller accumulates the text, e.g. via st.write_stream).
+# Each chunk is cleaned before it reaches the screen.
+# ---------------------------------------------------------------
+def stream_summary(data, valuation_label=None, news_summaries=None):
+    try:
+        for chunk in cached_completion_stream(
+            client,
+            model="gpt-3.5-turbo",
+            temperature=0.3,
+            messages=_build_summary_messages(data, valuation_label, news_summaries)
+        ):
+            yield clean_text(chunk)
+    except Exception as e:
+        yield f"Error generating summary: {e}"
+
 # --------------------------------------------------
 # Extract final GPT recommendation (Buy/Hold/Sell)
 # --------------------------------------------------
@@ -121,14 +142,13 @@ Client Portfolio:
 Provide a clear, professional insight as if writing an internal investment note for senior partners. Avoid unnecessary repetition or fluff.
 """
 
-    response = client.chat.completions.create(
+    return cached_completion(
+        client,
         model="gpt-3.5-turbo",
         messages=[{"role": "user", "content": prompt}],
         temperature=0.3,
     )
 
-    return response.choices[0].message.content.strip()
-
 # ------------------------------------------------------------
 # Generate a client-facing summary for a recommended portfolio
 # ------------------------------------------------------------
@@ -171,9 +191,9 @@ You are a senior portfolio strategist at a top-tier investment advisory firm. Ba
 Use a confident, professional tone as if presenting to the CIO of a private wealth fund.
 """
 
-    response = client.chat.completions.create(
+    return cached_completion(
+        client,
         model="gpt-3.5-turbo",
         messages=[{"role": "user", "content": prompt}],
         temperature=0.2
     )
-    return response.choices[0].message.content.strip()
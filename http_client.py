@@ -0,0 +1,48 @@
+# http_client.py
+# Shared pooled HTTP session with timeouts and retries.
+# Rate limiting happens in upstream_scheduler, which every request goes through.
+
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from upstream_scheduler import call, PROVIDERS, INTERACTIVE
+
+DEFAULT_TIMEOUT = (3.05, 15)  # (connect, read) seconds
+
+FINNHUB_BASE_URL = "https://finnhub.io/api/v1"
+FINNHUB_MAX_CONCURRENCY = PROVIDERS["finnhub"]["concurrency"]
+MAX_429_RETRIES = 4
+
+
+def _build_session():
+    session = requests.Session()
+    # 429s are handled by the caller so the limiter sees every retry
+    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504), allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+session = _build_session()
+
+
+def finnhub_get(path, params, priority=INTERACTIVE):
+    """
+    GET a Finnhub endpoint through the shared session and the scheduler's Finnhub budget.
+    On 429 the call waits (Retry-After, else exponential backoff) and tries again.
+    """
+    url = f"{FINNHUB_BASE_URL}/{path.lstrip('/')}"
+    for attempt in range(MAX_429_RETRIES + 1):
+        response = call("finnhub", session.get, url, params=params, timeout=DEFAULT_TIMEOUT, priority=priority)
+        if response.status_code != 429 or attempt == MAX_429_RETRIES:
+            return response
+
+        retry_after = response.headers.get("Retry-After")
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = 2 ** attempt
+        time.sleep(min(delay, 60))
+    return response
@@ -0,0 +1,112 @@
+# llm_cache.py
+# Persistent, content-addressed cache for OpenAI chat completions.
+# Identical (model, temperature, messages, options) requests are answered
+# from the local store until they expire or are evicted as least recently used.
+
+import hashlib
+import json
+import time
+from data_store import get_connection
+from upstream_scheduler import call, call_stream
+
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 3600
+LLM_CACHE_MAX_ENTRIES = 20000
+
+
+def _cache_key(model, temperature, messages, options):
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "messages": messages, "options": options},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _lookup(key):
+    now = time.time()
+    conn = get_connection()
+    row = conn.execute(
+        "SELECT response, created_at FROM llm_responses WHERE cache_key = ?", (key,)
+    ).fetchone()
+    if row is None or now - row[1] >= LLM_CACHE_TTL_SECONDS:
+        return None
+    with conn:
+        conn.execute("UPDATE llm_responses SET last_used = ? WHERE cache_key = ?", (now, key))
+    return row[0]
+
+
+def _store(key, model, response):
+    now = time.time()
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_responses (cache_key, model, response, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, model, response, now, now),
+        )
+        # Drop expired entries, then the least recently used beyond the size bound
+        conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - LLM_CACHE_TTL_SECONDS,))
+        conn.execute(
+            "DELETE FROM llm_responses WHERE cache_key IN ("
+            "SELECT cache_key FROM llm_responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (LLM_CACHE_MAX_ENTRIES,),
+        )
+
+
+def lookup_completion(model, messages, temperature, **options):
+    """Cached text for a request, or None. Never calls the API."""
+    return _lookup(_cache_key(model, temperature, messages, options))
+
+
+def store_completion(model, messages, temperature, text, **options):
+    """Store `text` as the response to a request, e.g. one part of a batched reply."""
+    _store(_cache_key(model, temperature, messages, options), model, text)
+
+
+def fresh_completion(client, model, messages, temperature, key=None, **options):
+    """Stripped text of a chat completion through the scheduler, bypassing the cache."""
+    # Concurrent identical requests share one API call when they share a key
+    response = call(
+        "openai", client.chat.completions.create,
+        model=model, messages=messages, temperature=temperature, key=key, **options
+    )
+    return response.choices[0].message.content.strip()
+
+
+def cached_completion(client, model, messages, temperature, **options):
+    """
+    Return the stripped text of a chat completion, calling OpenAI only on a cache miss.
+    Exceptions from the API propagate and nothing is cached for them.
+    """
+    key = _cache_key(model, temperature, messages, options)
+    cached = _lookup(key)
+    if cached is not None:
+        return cached
+
+    text = fresh_completion(client, model, messages, temperature, key=key, **options)
+    _store(key, model, text)
+    return text
+
+
+def cached_completion_stream(client, model, messages, temperature, **options):
+    """
+    Yield a chat completion as text chunks. A cached response is yielded in one
+    piece; a fresh one is streamed and stored once it has fully arrived.
+    """
+    key = _cache_key(model, temperature, messages, options)
+    cached = _lookup(key)
+    if cached is not None:
+        yield cached
+        return
+
+    # The scheduler reads the stream in its worker, so the whole response counts
+    # against the OpenAI concurrency slot, not just opening it
+    stream = call_stream(
+        "openai", client.chat.completions.create,
+        model=model, messages=messages, temperature=temperature, stream=True, **options
+    )
+    parts = []
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+            yield chunk.choices[0].delta.content
+    _store(key, model, "".join(parts).strip())
@@ -4,22 +4,28 @@
 # Core libraries
 import pandas as pd
 import streamlit as st
-import yfinance as yf
-from io import BytesIO
-import matplotlib.pyplot as plt
 
 # Custom modules 
-from finance_utils import get_peg_ratio, get_stock_info, get_analyst_price_targets
-from gpt_summary import generate_summary
-from utils import format_number, clean_company_name, style_ui, clean_text, render_grouped_metrics
-from news_utils import get_company_news_finnhub, summarize_news_article, get_news_for_portfolio
-from benchmark_engine import get_benchmark_metrics, compare_sector_allocation
-from charts import display_stock_price_chart
-from watchlist_utils import init_watchlist, display_watchlist_sidebar, add_to_watchlist_button
-from docx_exporter import generate_word_report
-from portfolio_engine import analyze_portfolio
-from portfolio_utils import generate_portfolio_insight, get_portfolio_sector_weights, resolve_to_ticker
+from analysis_pipeline import run_company_analysis
+from gpt_summary import stream_summary
+from market_data import get_ticker_info
+from ticker_search import search_tickers  # Index over tickers.csv, built once per process
+from price_history import DEFAULT_TIME_RANGE
+from utils import format_number, clean_company_name, style_ui, clean_text, render_grouped_metrics, render_metric
+from news_utils import get_news_for_portfolio
+from benchmark_engine import compare_sector_allocation
+from peer_index import format_peer_ranks
+from charts import display_stock_price_chart, display_efficient_frontier, display_projection, display_backtest
+from watchlist_utils import init_watchlist, display_watchlist_sidebar, display_watchlist_export, add_to_watchlist_button
+from report_cache import build_report_files, report_fingerprint
+from portfolio_engine import analyze_portfolio, format_portfolio_table, format_portfolio_summary
+from risk_engine import analyze_portfolio_risk, format_risk_summary, format_risk_table, RISK_PERIODS
+from portfolio_utils import generate_portfolio_insight, get_portfolio_sector_weights, project_portfolio, resolve_tickers
 from portfolio_builder import build_ai_portfolio
+from portfolio_optimizer import OPTIMIZATION_METHODS
+from monte_carlo import SIMULATION_METHODS
+from backtester import run_backtest, benchmark_choices, REBALANCE_RULES, DEFAULT_BENCHMARK
+from upstream_scheduler import SCHEDULER_DEBUG, queue_metrics
 
 st.set_page_config(page_title="My AI Financial Analyst")
 st.title("My AI Financial Analyst")
@@ -28,12 +34,21 @@ style_ui()
 init_watchlist()
 display_watchlist_sidebar()
 
+display_watchlist_export()
+
+if SCHEDULER_DEBUG:
+    with st.sidebar.expander("Upstream queues"):
+        metrics = queue_metrics()
+        st.dataframe(pd.DataFrame({
+            provider: {**{f"queued {p}": n for p, n in m["queued"].items()}, **{k: v for k, v in m.items() if k != "queued"}}
+            for provider, m in metrics.items()
+        }).T)
+
 # Company Search and Analysis Block
 with st.expander("Analyze a Company", expanded=True):
     st.write("Enter a company name or ticker (e.g., Apple or AAPL).")
     st.info("For international stocks, use the full ticker (e.g., CIB for Bancolombia).")
 
-    tickers_df = pd.read_csv("tickers.csv")  # Load ticker dataset
     search_query = st.text_input("Search for a company or ticker:")
 
     # Session state defaults
@@ -42,16 +57,9 @@ with st.expander("Analyze a Company", expanded=True):
     if "run_analysis" not in st.session_state:
         st.session_state.run_analysis = False
 
-    # Match user input with known tickers
-    def match_ticker(query):
-        query = query.strip().lower()
-        tickers_df["Security_clean"] = tickers_df["Security"].str.lower()
-        matches = tickers_df[tickers_df["Security_clean"].str.contains(query)]
-        return matches[["Security", "Symbol"]].values.tolist()
-
     # Show suggestions
     if search_query:
-        suggestions = match_ticker(search_query)
+        suggestions = search_tickers(search_query)
         if suggestions:
             st.markdown("Did you mean:")
             for name, symbol in suggestions[:5]:
@@ -65,14 +73,13 @@ with st.expander("Analyze a Company", expanded=True):
         if search_query:
             possible_ticker = search_query.strip().upper()
             try:
-                ticker_obj = yf.Ticker(possible_ticker)
-                info = ticker_obj.info
+                info = get_ticker_info(possible_ticker, groups=("profile",))
                 if info and info.get("shortName"):
                     st.session_state.selected_ticker = possible_ticker
                     st.session_state.run_analysis = True
                     st.rerun()
                 else:
-                    matches = match_ticker(search_query)
+                    matches = search_tickers(search_query)
                     if matches:
                         st.session_state.selected_ticker = matches[0][1]
                         st.session_state.run_analysis = True
@@ -87,15 +94,16 @@ if st.session_state.run_analysis and st.session_state.selected_ticker:
     with st.expander("Analysis Results", expanded=True):
         final_ticker = st.session_state.selected_ticker
 
+        # The selected chart range decides how much price history the render needs
+        time_range = st.session_state.get("time_range", DEFAULT_TIME_RANGE)
+
         with st.spinner("Fetching data..."):
-            data = get_stock_info(final_ticker)
+            analysis = run_company_analysis(final_ticker, time_range, include_summary=False)
 
+        data = analysis["data"]
         if data:
-            try:
-                hist = yf.Ticker(final_ticker).history(period="1d")
-                closing_price = hist["Close"].iloc[-1] if not hist.empty else None
-            except:
-                closing_price = None
+            price_frame = analysis["price_frame"]
+            closing_price = analysis["closing_price"]
 
             clean_name = clean_company_name(data.get("shortName", ""))
             st.subheader(f"Company: {clean_name} ({final_ticker})")
@@ -113,7 +121,7 @@ if st.session_state.run_analysis and st.session_state.selected_ticker:
             render_grouped_metrics(data, closing_price)
 
             # PEG ratio insight
-            peg = get_peg_ratio(final_ticker)
+            peg = analysis["peg"]
             if peg is not None:
                 st.write(f"PEG Ratio: {peg}")
                 if peg < 1:
@@ -126,20 +134,31 @@ if st.session_state.run_analysis and st.session_state.selected_ticker:
                 st.write("PEG ratio not available.")
 
             # Benchmark comparison
-            st.subheader("Benchmark Comparison (Sector ETF)")
+            st.subheader("Benchmark Comparison (Sector)")
             sector = data.get("sector", "Unknown")
-            benchmark = get_benchmark_metrics(sector)
+            benchmark = analysis["benchmark"]
             if benchmark:
-                st.write(f"ETF Benchmark: {benchmark['Name']} ({benchmark['Benchmark']})")
-                st.write(f"- PE Ratio: {benchmark['PE']}")
-                st.write(f"- PB Ratio: {benchmark['PB']}")
-                st.write(f"- ROE: {benchmark['ROE']}")
+                source = "ETF Benchmark" if benchmark.get("Source") == "etf" else "Sector Benchmark"
+                st.write(f"{source}: {benchmark['Name']} ({benchmark['Benchmark']})")
+                for label, key in (("PE Ratio", "PE"), ("PB Ratio", "PB"), ("ROE", "ROE")):
+                    spread = f" (middle 50%: {benchmark[key + ' Range']})" if f"{key} Range" in benchmark else ""
+                    st.write(f"- {label}: {benchmark[key]}{spread}")
             else:
                 st.write("Benchmark data not available.")
 
+            # Rank within the sector's S&P 500 companies
+            peer_ranks = analysis.get("peer_ranks")
+            if peer_ranks is not None:
+                st.subheader("Peer Ranking (Sector)")
+                st.write(
+                    "Percentile among S&P 500 companies in the sector (100 = highest). "
+                    "For PE, PEG and Debt/Equity a low percentile means cheaper or less leveraged."
+                )
+                st.dataframe(format_peer_ranks(peer_ranks))
+
             # Analyst price target comparison
-            valuation_label = None
-            targets = get_analyst_price_targets(final_ticker)
+            valuation_label = analysis["valuation_label"]
+            targets = analysis["targets"]
 
             if targets and closing_price:
                 st.subheader("Analyst Target Price vs. Current Price")
@@ -152,21 +171,16 @@ if st.session_state.run_analysis and st.session_state.selected_ticker:
                     st.write(f"Average Target Price: ${mean:.2f}")
                     st.write(f"Current Price: {format_number(closing_price, style='usd')}")
 
-                    if closing_price < low:
+                    if valuation_label == "undervalued":
                         st.success("Valuation: Undervalued")
-                        valuation_label = "undervalued"
-                    elif low <= closing_price < mean:
+                    elif valuation_label == "fairly valued":
                         st.info("Valuation: Fairly Valued")
-                        valuation_label = "fairly valued"
-                    elif mean <= closing_price <= high:
+                    elif valuation_label == "slightly overvalued":
                         st.warning("Valuation: Slightly Overvalued")
-                        valuation_label = "slightly overvalued"
-                    elif closing_price > high:
+                    elif valuation_label == "overvalued":
                         st.error("Valuation: Overvalued")
-                        valuation_label = "overvalued"
                     else:
                         st.info("Valuation: Unclear")
-                        valuation_label = "unclear"
                 except Exception as e:
                     st.warning("Unable to process analyst price targets.")
                     st.text(f"Debug Info: {e}")
@@ -174,76 +188,49 @@ if st.session_state.run_analysis and st.session_state.selected_ticker:
                 st.write("Analyst price targets not available.")
 
             # Show price chart
-            display_stock_price_chart(final_ticker, clean_name)
-
-            # Prepare chart image for export
-            chart_buffer = BytesIO()
-            time_range = st.session_state.time_range
-            range_map = {
-                "1M": "1mo",
-                "6M": "6mo",
-                "1Y": "1y",
-                "5Y": "5y",
-                "YTD": "ytd",
-                "MAX": "max"
-            }
-            selected_period = range_map.get(time_range, "6mo")
-            chart_data = yf.Ticker(final_ticker).history(period=selected_period)
-
-            if not chart_data.empty and "Close" in chart_data.columns:
-                plt.figure(figsize=(10, 4))
-                plt.plot(chart_data.index, chart_data["Close"], label="Close Price", linewidth=2)
-                plt.title(f"{clean_name} Stock Price ({time_range})")
-                plt.xlabel("Date")
-                plt.ylabel("Price (USD)")
-                plt.grid(True)
-                plt.legend()
-                plt.tight_layout()
-                plt.savefig(chart_buffer, format="png", bbox_inches="tight", dpi=150)
-                chart_buffer.seek(0)
-                plt.close()
-            else:
-                chart_buffer = None
-                st.warning("Chart could not be generated for this ticker.")
+            display_stock_price_chart(final_ticker, clean_name, price_frame)
 
             # AI-generated investment summary
             st.subheader("AI-Powered Investment Summary")
-            news_list = get_company_news_finnhub(final_ticker)
-            summaries = []
-
-            if isinstance(news_list, list):
-                for item in news_list[:5]:
-                    if isinstance(item, dict):
-                        summary = summarize_news_article(item.get("title", ""), item.get("summary", ""))
-                        summaries.append(summary)
-
-            ai_summary = generate_summary(data, valuation_label=valuation_label, news_summaries=summaries)
-            st.write(clean_text(ai_summary))
-
-            # Export report to Word
-            st.subheader("Export Report")
-            doc = generate_word_report(
-                data=data,
-                ticker=final_ticker,
-                closing_price=closing_price,
-                peg=peg,
-                benchmark=benchmark,
-                targets=targets,
+            news_list = analysis["news"]
+            ai_summary = st.write_stream(stream_summary(
+                data,
                 valuation_label=valuation_label,
-                ai_summary=ai_summary,
-                chart_image=chart_buffer
-            )
+                news_summaries=analysis["news_summaries"] or []
+            ))
+            ai_summary = clean_text(ai_summary).strip()
 
-            buffer = BytesIO()
-            doc.save(buffer)
-            buffer.seek(0)
+            # Export report to Word, built only once the user asks for it
+            st.subheader("Export Report")
+            report = {
+                "data": data,
+                "closing_price": closing_price,
+                "peg": peg,
+                "benchmark": benchmark,
+                "targets": targets,
+                "valuation_label": valuation_label,
+                "ai_summary": ai_summary,
+            }
 
-            st.download_button(
-                label="Download Report (.docx)",
-                data=buffer,
-                file_name=f"{final_ticker}_financial_report.docx",
-                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-            )
+            if st.button("Prepare Report", key="prepare_report"):
+                st.session_state.report_requested = (final_ticker, time_range)
+
+            if st.session_state.get("report_requested") == (final_ticker, time_range):
+                fingerprint = report_fingerprint(price_frame, **report)
+                with st.spinner("Preparing report..."):
+                    chart_png, report_bytes = build_report_files(
+                        final_ticker, time_range, fingerprint,
+                        price_frame, f"{clean_name} Stock Price ({time_range})", report
+                    )
+                if chart_png is None:
+                    st.warning("Chart could not be generated for this ticker.")
+
+                st.download_button(
+                    label="Download Report (.docx)",
+                    data=report_bytes,
+                    file_name=f"{final_ticker}_financial_report.docx",
+                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                )
 
             # Display latest news
             st.subheader("Recent News")
@@ -274,6 +261,12 @@ with st.expander("Custom Portfolio Builder"):
     with st.form("portfolio_form"):
         tickers_input = st.text_input("Tickers (e.g., AAPL, MSFT, AMZN)")
         weights_input = st.text_input("Portfolio weights in %, optional (e.g., 40,30,30)")
+        risk_period = st.selectbox("Lookback period (risk, backtest and projection)", RISK_PERIODS)
+        rebalance_rule = st.selectbox("Backtest rebalancing", list(REBALANCE_RULES), format_func=REBALANCE_RULES.get)
+        benchmark_etf = st.selectbox("Backtest benchmark", benchmark_choices())
+        portfolio_capital = st.number_input("Invested capital (USD)", min_value=100.0, value=10_000.0, step=100.0)
+        custom_years = st.slider("Projection horizon (years)", min_value=1, max_value=30, value=10)
+        custom_method = st.selectbox("Simulation method", list(SIMULATION_METHODS), format_func=SIMULATION_METHODS.get)
         submitted = st.form_submit_button("Build Portfolio")
 
     weights = None
@@ -282,15 +275,7 @@ with st.expander("Custom Portfolio Builder"):
     
     
         raw_inputs = [t.strip() for t in tickers_input.split(",") if t.strip()]
-        tickers = []
-        unresolved = []
-
-        for item in raw_inputs:
-            resolved = resolve_to_ticker(item)
-            if resolved:
-                tickers.append(resolved)
-            else:
-                unresolved.append(item)
+        tickers, unresolved = resolve_tickers(raw_inputs)
 
         if unresolved:
             st.warning(f"The following entries could not be resolved: {', '.join(unresolved)}")
@@ -314,6 +299,7 @@ with st.expander("Custom Portfolio Builder"):
         else:
             with st.spinner("Analyzing portfolio..."):
                 df, summary = analyze_portfolio(tickers, weights)
+                table = format_portfolio_table(df)
 
             st.subheader("Portfolio Composition")
             st.markdown("""
@@ -325,16 +311,16 @@ with st.expander("Custom Portfolio Builder"):
     - **Debt/Equity**: Lower = less risk from debt.
     - **Weight**: Allocation of each stock in your portfolio.
             """)
-            st.dataframe(df)
+            st.dataframe(table)
 
             st.subheader("Weighted Averages")
             st.markdown("These represent the overall profile of your portfolio:")
 
-            for k, v in summary.items():
+            for k, v in format_portfolio_summary(summary).items():
                 st.write(f"- {k}: {v}")
 
             # AI insight on portfolio
-            insight = generate_portfolio_insight(df)
+            insight = generate_portfolio_insight(table)
             st.subheader("AI Insight")
             st.info(insight)
 
@@ -344,6 +330,67 @@ with st.expander("Custom Portfolio Builder"):
             st.subheader("Sector Benchmark Check (vs S&P 500)")
             st.info(sector_insight)
 
+            # Risk analytics from daily price history
+            st.subheader("Risk Analytics")
+            with st.spinner("Computing risk metrics..."):
+                risk = analyze_portfolio_risk(df["Ticker"].tolist(), df["Weight"].tolist(), period=risk_period)
+
+            if risk is None:
+                st.warning("Not enough price history to compute risk metrics.")
+            else:
+                st.markdown(f"""
+    Based on {risk["observations"]} trading days of daily returns ({risk_period}):
+
+    - **Volatility**: Annualized standard deviation of returns.
+    - **VaR / CVaR**: One-day loss not exceeded on {risk["confidence"]:.0%} of days, and the average loss on the remaining days.
+    - **Max Drawdown**: Largest fall from a previous peak.
+    - **Risk Contribution**: Share of portfolio variance coming from each holding.
+                """)
+                if risk["excluded"]:
+                    st.warning(f"Not enough price history for: {', '.join(risk['excluded'])}")
+
+                summary_values = list(format_risk_summary(risk["portfolio"]).items())
+                for column, items in zip(st.columns(3), (summary_values[:2], summary_values[2:4], summary_values[4:])):
+                    with column:
+                        for label, value in items:
+                            render_metric(label, value)
+
+                st.dataframe(format_risk_table(risk["holdings"]))
+
+                if not risk["rolling"].empty:
+                    st.markdown(f"Rolling {risk['window']}-day risk")
+                    st.line_chart(risk["rolling"][["Volatility", "VaR", "Max Drawdown"]])
+
+                st.markdown("Correlation matrix")
+                st.dataframe(risk["correlation"].round(2))
+
+            # Historical backtest against the chosen benchmark
+            st.subheader("Backtest")
+            with st.spinner("Running backtest..."):
+                backtest_result = run_backtest(
+                    dict(zip(df["Ticker"], df["Weight"])), period=risk_period,
+                    rebalance=rebalance_rule, benchmark=benchmark_etf, capital=portfolio_capital
+                )
+
+            if backtest_result is None:
+                st.warning("Not enough price history to backtest this portfolio.")
+            else:
+                if backtest_result["excluded"]:
+                    st.warning(f"No price history to backtest: {', '.join(backtest_result['excluded'])}")
+                display_backtest(backtest_result, REBALANCE_RULES[rebalance_rule])
+
+            # Monte Carlo projection from the same lookback history
+            st.subheader("Projected Value")
+            with st.spinner("Simulating future portfolio values..."):
+                projection = project_portfolio(
+                    df.set_index("Ticker")["Weight"], portfolio_capital, custom_years, custom_method, period=risk_period
+                )
+
+            if projection is None:
+                st.warning("Not enough price history to simulate this portfolio.")
+            else:
+                display_projection(projection, portfolio_capital)
+
 # AI Portfolio builder
 with st.expander("AI-Powered Portfolio Builder"):
 
@@ -360,6 +407,13 @@ with st.expander("AI-Powered Portfolio Builder"):
         )
 
     risk_level = st.selectbox("Select your risk tolerance", ["Low", "Medium", "High"])
+    optimization = st.selectbox(
+        "Weighting method", list(OPTIMIZATION_METHODS), format_func=OPTIMIZATION_METHODS.get
+    )
+    projection_years = st.slider("Projection horizon (years)", min_value=1, max_value=30, value=10)
+    simulation_method = st.selectbox(
+        "Simulation method", list(SIMULATION_METHODS), format_func=SIMULATION_METHODS.get
+    )
     sector_pref = st.text_input("Preferred sectors (optional, comma-separated)", "")
     country_pref = st.text_input("Preferred countries (optional, comma-separated)", "")
 
@@ -368,13 +422,47 @@ with st.expander("AI-Powered Portfolio Builder"):
             "risk_level": risk_level,
             "sectors": [s.strip() for s in sector_pref.split(",") if s.strip()],
             "countries": [c.strip() for c in country_pref.split(",") if c.strip()],
-            "num_stocks": int(num_stocks) if num_stocks else None
+            "num_stocks": int(num_stocks) if num_stocks else None,
+            "optimization": optimization
         }
 
         # Call AI builder function
-        ai_portfolio, ai_summary = build_ai_portfolio(capital, preferences)
+        ai_portfolio, ai_summary, ai_details = build_ai_portfolio(capital, preferences)
         st.write("AI Portfolio Recommendation")
         st.dataframe(ai_portfolio)
+
+        if ai_details["frontier"] is not None:
+            chosen = ai_details["frontier"].iloc[ai_details["point"]]
+            st.markdown(
+                f"**{OPTIMIZATION_METHODS[ai_details['method']]}** portfolio: "
+                f"expected return {format_number(chosen['Return'], style='percent')}, "
+                f"volatility {format_number(chosen['Volatility'], style='percent')}, "
+                f"Sharpe ratio {format_number(chosen['Sharpe'], style='ratio')}"
+            )
+            display_efficient_frontier(ai_details["frontier"], ai_details["point"])
+
+        # Monte Carlo projection of the capital over the chosen horizon
+        if not ai_details["weights"].empty:
+            with st.spinner("Simulating future portfolio values..."):
+                projection = project_portfolio(ai_details["weights"], capital, projection_years, simulation_method)
+
+            st.subheader("Projected Value")
+            if projection is None:
+                st.warning("Not enough price history to simulate this portfolio.")
+            else:
+                display_projection(projection, capital)
+
+            # How the same weights would have done, rebalanced quarterly
+            st.subheader("Backtest")
+            backtest_result = run_backtest(
+                ai_details["weights"], period="5y", rebalance="quarterly", benchmark=DEFAULT_BENCHMARK, capital=capital
+            )
+            if backtest_result is None:
+                st.warning("Not enough price history to backtest this portfolio.")
+            else:
+                if backtest_result["excluded"]:
+                    st.warning(f"No price history to backtest: {', '.join(backtest_result['excluded'])}")
+                display_backtest(backtest_result, REBALANCE_RULES["quarterly"])
         st.markdown("AI Analyst Report")
         st.write(ai_summary)
 
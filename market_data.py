@@ -0,0 +1,164 @@
+# market_data.py
+# Shared per-ticker snapshot of Yahoo's raw `info` payload
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import yfinance as yf
+from data_store import read_fundamentals, write_fundamentals
+from upstream_scheduler import call, INTERACTIVE
+
+# `info` keys are stored in field groups that go stale at different speeds.
+# Keys not listed here belong to the "market" group.
+FIELD_GROUPS = {
+    "profile": ("shortName", "longName", "sector", "industry", "country", "quoteType", "logo_url"),
+    "targets": ("targetLowPrice", "targetHighPrice", "targetMeanPrice", "targetMedianPrice"),
+}
+GROUP_TTLS = {
+    "profile": 7 * 24 * 3600,
+    "market": 3600,
+    "targets": 12 * 3600,
+}
+ALL_GROUPS = tuple(GROUP_TTLS)
+# A group Yahoo returned empty (bad symbol, throttled reply) is retried after
+# this long and never written to the store
+EMPTY_GROUP_TTL = 300
+
+# In-process layer in front of the on-disk store. Plain dict rather than
+# st.cache_data so helpers running outside a Streamlit script (threads,
+# batch jobs) share the same snapshots.
+_info_cache = {}
+_info_lock = threading.Lock()
+_symbol_locks = {}
+
+# Called as listener(symbol, info) whenever fresh `info` arrives from Yahoo
+_refresh_listeners = []
+
+
+def _split_into_groups(info):
+    grouped_keys = {key: group for group, keys in FIELD_GROUPS.items() for key in keys}
+    payloads = {group: {} for group in ALL_GROUPS}
+    for key, value in info.items():
+        payloads[grouped_keys.get(key, "market")][key] = value
+    return payloads
+
+
+def _has_data(payload):
+    return any(value is not None for value in payload.values())
+
+
+def _fresh_groups(entries, groups, now):
+    """Pick the requested groups whose (payload, fetched_at) entry is within its TTL."""
+    return {
+        group: entries[group]
+        for group in groups
+        if group in entries
+        and now - entries[group][1] < (GROUP_TTLS[group] if _has_data(entries[group][0]) else EMPTY_GROUP_TTL)
+    }
+
+
+def _lookup_cached(symbol, groups, now):
+    with _info_lock:
+        entries = dict(_info_cache.get(symbol, {}))
+    fresh = _fresh_groups(entries, groups, now)
+
+    missing = [group for group in groups if group not in fresh]
+    if missing:
+        stored = _fresh_groups(read_fundamentals(symbol, missing), missing, now)
+        if stored:
+            with _info_lock:
+                _info_cache.setdefault(symbol, {}).update(stored)
+            fresh.update(stored)
+    return fresh
+
+
+def _fetch_info(symbol):
+    return yf.Ticker(symbol).info or {}
+
+
+def add_refresh_listener(listener):
+    """Register a callback for freshly fetched `info`, so derived indexes can update incrementally."""
+    _refresh_listeners.append(listener)
+
+
+def _notify_refresh(symbol, info):
+    for listener in _refresh_listeners:
+        try:
+            listener(symbol, info)
+        except Exception as e:
+            print(f"[MARKET DATA] Refresh listener failed for {symbol}: {e}")
+
+
+def get_ticker_info(ticker, groups=ALL_GROUPS, priority=INTERACTIVE):
+    """
+    Return Yahoo `info` fields for a ticker, limited to the requested field groups.
+    Reads go memory -> on-disk store -> Yahoo, so each group is fetched upstream
+    at most once per TTL no matter how many sessions or processes ask for it.
+    Upstream fetches are queued on the scheduler with the given priority.
+    """
+    symbol = ticker.strip().upper()
+    groups = tuple(groups)
+
+    fresh = _lookup_cached(symbol, groups, time.time())
+    if len(fresh) < len(groups):
+        with _info_lock:
+            symbol_lock = _symbol_locks.setdefault(symbol, threading.Lock())
+
+        # Only one thread refreshes a symbol; the rest wait and reuse its result
+        with symbol_lock:
+            fresh = _lookup_cached(symbol, groups, time.time())
+            if len(fresh) < len(groups):
+                info = call("yahoo", _fetch_info, symbol, key=("info", symbol), priority=priority)
+
+                fetched_at = time.time()
+                payloads = _split_into_groups(info)
+                # Empty groups stay in memory only, with the short EMPTY_GROUP_TTL
+                write_fundamentals(
+                    symbol, {group: payload for group, payload in payloads.items() if _has_data(payload)}, fetched_at
+                )
+                entries = {group: (payload, fetched_at) for group, payload in payloads.items()}
+                with _info_lock:
+                    _info_cache.setdefault(symbol, {}).update(entries)
+                fresh = {group: entries[group] for group in groups}
+                if _has_data(payloads["market"]):
+                    _notify_refresh(symbol, info)
+
+    merged = {}
+    for group in groups:
+        merged.update(fresh[group][0])
+    return merged
+
+
+def fetch_info_batch(tickers, max_workers=16, priority=INTERACTIVE):
+    """
+    Fetch `info` for many tickers concurrently, tolerating individual failures.
+    Upstream concurrency is bounded by the scheduler's Yahoo budget.
+    Returns (infos, failures, stats): infos maps ticker -> info dict, failures
+    maps ticker -> error message, stats holds counts and wall-clock time.
+    """
+    symbols = list(dict.fromkeys(t.strip().upper() for t in tickers if t and t.strip()))
+    infos = {}
+    failures = {}
+    started = time.perf_counter()
+
+    def fetch(symbol):
+        try:
+            return symbol, get_ticker_info(symbol, priority=priority), None
+        except Exception as e:
+            return symbol, None, str(e)
+
+    if symbols:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols))) as pool:
+            for symbol, info, error in pool.map(fetch, symbols):
+                if error is None:
+                    infos[symbol] = info
+                else:
+                    failures[symbol] = error
+
+    stats = {
+        "requested": len(symbols),
+        "fetched": len(infos),
+        "failed": len(failures),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+    return infos, failures, stats
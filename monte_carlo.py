@@ -0,0 +1,156 @@
+# monte_carlo.py
+# Forward Monte Carlo projection of a portfolio's value.
+# Paths are simulated in fixed-size chunks across a process pool; each chunk
+# folds its paths into per-month histograms of log value and is then thrown
+# away, so peak memory depends on the chunk size, not the number of paths.
+# Chunk seeds are spawned from one SeedSequence, so a seed reproduces the
+# same bands whatever the number of workers.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import numpy as np
+import pandas as pd
+
+from portfolio_optimizer import ledoit_wolf
+
+TRADING_DAYS_PER_MONTH = 21
+SIMULATION_METHODS = {
+    "cholesky": "Correlated normal (Cholesky)",
+    "bootstrap": "Historical bootstrap",
+}
+PERCENTILES = (5, 25, 50, 75, 95)
+
+DEFAULT_PATHS = 100_000
+DEFAULT_SEED = 42
+CHUNK_MEMORY_BYTES = 32 * 1024 * 1024  # Working memory of one chunk
+MIN_CHUNK_PATHS = 1_000
+MAX_CHUNK_PATHS = 20_000
+
+# Histogram of log(value / starting value): x0.0067 to x148 in 0.25% steps
+LOG_VALUE_RANGE = (-5.0, 5.0)
+HISTOGRAM_BINS = 4000
+
+# Set in each worker by _init_worker, so the model is sent once per process
+_model = None
+
+
+def _init_worker(model):
+    global _model
+    _model = model
+
+
+def _monthly_log_returns(model, rng, paths):
+    """One month of portfolio log returns for `paths` paths."""
+    if model["method"] == "cholesky":
+        # Correlated monthly log returns per holding, rebalanced to the weights each month
+        shocks = rng.standard_normal((paths, len(model["mean"])))
+        holding_returns = np.expm1(model["mean"] + shocks @ model["factor"].T)
+        return np.log1p(holding_returns @ model["weights"])
+
+    # Whole historical days keep the cross-sectional correlation of that day
+    days = rng.integers(0, len(model["daily_log_returns"]), size=(paths, TRADING_DAYS_PER_MONTH))
+    return model["daily_log_returns"][days].sum(axis=1)
+
+
+def _simulate_chunk(job):
+    """Simulate one chunk and return its per-month histogram counts and terminal sums."""
+    seed_sequence, paths = job
+    model = _model
+    rng = np.random.default_rng(seed_sequence)
+    low, high = LOG_VALUE_RANGE
+    scale = HISTOGRAM_BINS / (high - low)
+
+    counts = np.zeros((model["months"], HISTOGRAM_BINS), dtype=np.int64)
+    log_value = np.zeros(paths)
+    for month in range(model["months"]):
+        log_value += _monthly_log_returns(model, rng, paths)
+        bins = np.clip(((log_value - low) * scale).astype(np.int64), 0, HISTOGRAM_BINS - 1)
+        counts[month] = np.bincount(bins, minlength=HISTOGRAM_BINS)
+
+    return counts, float(np.exp(log_value).sum()), int((log_value < 0).sum())
+
+
+def _percentiles_from_histogram(counts, percentiles):
+    """Value multiples at each percentile for every row of a histogram, interpolating inside bins."""
+    low, high = LOG_VALUE_RANGE
+    width = (high - low) / HISTOGRAM_BINS
+    cumulative = np.cumsum(counts, axis=1)
+    totals = cumulative[:, -1:]
+
+    columns = []
+    for p in percentiles:
+        target = totals * p / 100
+        index = np.minimum((cumulative < target).sum(axis=1, keepdims=True), HISTOGRAM_BINS - 1)
+        before = np.take_along_axis(cumulative, index, axis=1) - np.take_along_axis(counts, index, axis=1)
+        inside = np.take_along_axis(counts, index, axis=1)
+        fraction = np.where(inside > 0, (target - before) / np.maximum(inside, 1), 0.5)
+        columns.append(np.exp(low + (index + fraction) * width)[:, 0])
+    return np.column_stack(columns)
+
+
+def build_model(returns, weights, years, method="cholesky"):
+    """
+    Everything a worker needs to simulate a portfolio.
+    `returns` is a DataFrame of daily simple returns (days x tickers) and
+    `weights` a Series over the same tickers.
+    """
+    weights = weights.reindex(returns.columns).fillna(0.0).to_numpy(dtype="float64")
+    weights = weights / weights.sum()
+    daily_log = np.log1p(returns.to_numpy(dtype="float64"))
+    model = {"method": method, "months": int(round(years * 12)), "weights": weights}
+
+    if method == "cholesky":
+        covariance, _ = ledoit_wolf(daily_log)  # Positive definite even with more names than days
+        model["mean"] = daily_log.mean(axis=0) * TRADING_DAYS_PER_MONTH
+        model["factor"] = np.linalg.cholesky(covariance * TRADING_DAYS_PER_MONTH)
+    elif method == "bootstrap":
+        # Constant weights each day, as in risk_engine
+        model["daily_log_returns"] = np.log1p(returns.to_numpy(dtype="float64") @ weights)
+    else:
+        raise ValueError(f"Unknown simulation method: {method}")
+    return model
+
+
+def simulate_portfolio(returns, weights, capital, years=10, paths=DEFAULT_PATHS, method="cholesky",
+                       seed=DEFAULT_SEED, workers=None):
+    """
+    Project the value of `capital` invested at `weights` over `years`, in monthly steps.
+    Returns a dict with "bands" (DataFrame of value percentiles per month, month 0
+    being today), "terminal" (percentile -> final value), "mean_terminal",
+    "probability_of_loss" and the run settings.
+    """
+    model = build_model(returns, weights, years, method)
+    names = len(model["weights"])
+    chunk_paths = int(np.clip(CHUNK_MEMORY_BYTES // (8 * 4 * max(names, TRADING_DAYS_PER_MONTH)),
+                              MIN_CHUNK_PATHS, MAX_CHUNK_PATHS))
+    sizes = [chunk_paths] * (paths // chunk_paths) + ([paths % chunk_paths] if paths % chunk_paths else [])
+    jobs = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        # Spawned workers only import this module and NumPy, not the Streamlit app
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(model,)) as pool:
+            results = list(pool.map(_simulate_chunk, jobs))
+    else:
+        _init_worker(model)
+        results = [_simulate_chunk(job) for job in jobs]
+
+    counts = sum(result[0] for result in results)
+    multiples = _percentiles_from_histogram(counts, PERCENTILES)
+    bands = pd.DataFrame(capital * multiples, columns=[f"P{p}" for p in PERCENTILES], index=np.arange(1, model["months"] + 1))
+    bands.loc[0] = capital
+    bands = bands.sort_index()
+    bands.index.name = "Month"
+
+    return {
+        "bands": bands,
+        "terminal": {p: float(bands[f"P{p}"].iloc[-1]) for p in PERCENTILES},
+        "mean_terminal": capital * sum(result[1] for result in results) / paths,
+        "probability_of_loss": sum(result[2] for result in results) / paths,
+        "paths": paths,
+        "years": years,
+        "method": method,
+        "seed": seed,
+    }
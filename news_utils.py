@@ -1,51 +1,89 @@
+import datetime
+import json
+import time
 import streamlit as st
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
+from llm_cache import cached_completion, fresh_completion, lookup_completion, store_completion
+from data_store import read_news, write_news
+from http_client import finnhub_get, FINNHUB_MAX_CONCURRENCY
 
 #Use Streamlit's secure secrets manager
 client = OpenAI(api_key=st.secrets["openai_api_key"])
 FINNHUB_API_KEY = st.secrets["finnhub_api_key"]
 
-def get_company_news_finnhub(ticker):
-    """Fetch recent company news with headline, summary, and URL using Finnhub API."""
+# Local news store settings
+NEWS_REFRESH_SECONDS = 600  # Ask Finnhub for new articles at most this often per ticker
+NEWS_FIRST_LOOKBACK_DAYS = 7  # Window fetched the first time a ticker is seen
+NEWS_HISTORY_LIMIT = 200  # Most recent articles kept per ticker
+NEWS_MAX_AGE_DAYS = NEWS_FIRST_LOOKBACK_DAYS  # Older stored articles are no longer served as recent
+
+# Per-article summary request; batched replies are cached under these keys too
+SUMMARY_MODEL = "gpt-3.5-turbo"
+SUMMARY_TEMPERATURE = 0.3
+SUMMARY_MAX_TOKENS = 100
+
+
+def _fetch_finnhub_news(ticker, since_timestamp):
+    """Fetch articles published on or after the day of `since_timestamp` from Finnhub."""
+    today = datetime.date.today()
+    if since_timestamp is None:
+        start = today - datetime.timedelta(days=NEWS_FIRST_LOOKBACK_DAYS)
+    else:
+        start = datetime.date.fromtimestamp(since_timestamp)
+
+    response = finnhub_get(
+        "company-news",
+        {"symbol": ticker, "from": start.isoformat(), "to": today.isoformat(), "token": FINNHUB_API_KEY}
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"Failed to fetch news (status code {response.status_code})")
+
+    rows = []
+    for item in response.json():
+        title = item.get("headline", "")
+        url = item.get("url", "")
+        if not (title and url):
+            continue
+        # Finnhub ids identify articles; fall back to the URL when one is missing
+        article_key = str(item.get("id") or url)
+        rows.append((article_key, float(item.get("datetime") or 0), {
+            "title": title,
+            "summary": item.get("summary", ""),
+            "url": url
+        }))
+    return rows
+
+
+def get_company_news_finnhub(ticker, limit=10):
+    """
+    Recent company news with headline, summary, and URL, served from the local news store.
+    Finnhub is only asked for articles since the newest one already stored, and
+    articles older than NEWS_MAX_AGE_DAYS are not served.
+    """
     try:
         if not FINNHUB_API_KEY:
             return ["Error: Finnhub API key not found."]
 
-        url = f"https://finnhub.io/api/v1/company-news?symbol={ticker}&from=2024-06-25&to=2025-07-02&token={FINNHUB_API_KEY}"
-        response = requests.get(url)
+        ticker = ticker.strip().upper()
+        since = time.time() - NEWS_MAX_AGE_DAYS * 86400
+        articles, newest, checked_at = read_news(ticker, limit, since)
 
-        if response.status_code != 200:
-            return [f"Error: Failed to fetch news (status code {response.status_code})"]
-
-        news_items = response.json()
-        articles = []
-
-        for item in news_items:
-            title = item.get("headline", "")
-            summary = item.get("summary", "")
-            url = item.get("url", "")
-
-            if title and url:
-                articles.append({
-                    "title": title,
-                    "summary": summary,
-                    "url": url
-                })
-
-            if len(articles) >= 10:  # Limit to 10 articles speed.
-                break
+        if checked_at is None or time.time() - checked_at >= NEWS_REFRESH_SECONDS:
+            try:
+                write_news(ticker, _fetch_finnhub_news(ticker, newest), keep=NEWS_HISTORY_LIMIT)
+                articles, _, _ = read_news(ticker, limit, since)
+            except Exception as e:
+                # Serve what is stored; only surface the error when there is nothing to show
+                if not articles:
+                    return [f"Error: {str(e)}"]
 
         return articles if articles else ["No recent news available."]
     except Exception as e:
         return [f"Error: {str(e)}"]
 
 
-def summarize_news_article(title, summary):
-    """
-    Summarizes a single news headline and snippet using GPT.
-    If only the title is available, it will summarize based on that.
-    """
+def _article_messages(title, summary):
     prompt = f"""
 You're an AI analyst. Summarize this company news in 2 concise sentences, keeping it factual and neutral:
 
@@ -54,31 +92,128 @@ Summary: {summary}
 
 Return only the summary.
 """
+    return [
+        {"role": "system", "content": "You are a professional financial summarizer."},
+        {"role": "user", "content": prompt}
+    ]
+
 
+def summarize_news_article(title, summary):
+    """
+    Summarizes a single news headline and snippet using GPT.
+    If only the title is available, it will summarize based on that.
+    """
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a professional financial summarizer."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=100
+        return cached_completion(
+            client,
+            model=SUMMARY_MODEL,
+            messages=_article_messages(title, summary),
+            temperature=SUMMARY_TEMPERATURE,
+            max_tokens=SUMMARY_MAX_TOKENS
         )
-        return response.choices[0].message.content.strip()
 
     except Exception as e:
         return f"News summary error: {e}"
 
 
+def _parse_summary_list(text, expected):
+    """Read a JSON array of `expected` strings from a model reply, or return None."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.find("["):]
+    try:
+        summaries = json.loads(text[text.find("["):text.rfind("]") + 1])
+    except ValueError:
+        return None
+    if not isinstance(summaries, list) or len(summaries) != expected:
+        return None
+    if not all(isinstance(item, str) for item in summaries):
+        return None
+    return [item.strip() for item in summaries]
+
+
+def summarize_news_articles(articles, max_workers=5):
+    """
+    Summarizes several news articles (dicts with title and summary).
+    Each article is looked up in the per-article cache first; the misses go out
+    in one GPT request, and every parsed summary is cached per article, so a
+    shifted headline window only pays for its new articles. A reply that can't
+    be parsed is not cached and the misses are summarized one by one instead.
+    """
+    if not articles:
+        return []
+
+    messages = [_article_messages(item.get("title", ""), item.get("summary", "")) for item in articles]
+    summaries = [
+        lookup_completion(SUMMARY_MODEL, m, SUMMARY_TEMPERATURE, max_tokens=SUMMARY_MAX_TOKENS) for m in messages
+    ]
+    missing = [i for i, text in enumerate(summaries) if text is None]
+
+    if len(missing) > 1:
+        listing = "\n\n".join(
+            f"Article {number}:\nTitle: {articles[i].get('title', '')}\nSummary: {articles[i].get('summary', '')}"
+            for number, i in enumerate(missing, start=1)
+        )
+        prompt = f"""
+You're an AI analyst. Summarize each of the {len(missing)} company news articles below in 2 concise sentences, keeping them factual and neutral.
+
+{listing}
+
+Return only a JSON array of {len(missing)} strings, one summary per article, in the same order.
+"""
+
+        try:
+            reply = fresh_completion(
+                client,
+                model=SUMMARY_MODEL,
+                messages=[
+                    {"role": "system", "content": "You are a professional financial summarizer."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=SUMMARY_TEMPERATURE,
+                max_tokens=SUMMARY_MAX_TOKENS * len(missing)
+            )
+            parsed = _parse_summary_list(reply, len(missing))
+            if parsed is not None:
+                for i, text in zip(missing, parsed):
+                    summaries[i] = text
+                    store_completion(SUMMARY_MODEL, messages[i], SUMMARY_TEMPERATURE, text, max_tokens=SUMMARY_MAX_TOKENS)
+                return summaries
+            print("[NEWS SUMMARY] Batch reply could not be parsed, summarizing one by one")
+        except Exception as e:
+            print(f"[NEWS SUMMARY] Batch request failed, summarizing one by one: {e}")
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            fallback = pool.map(
+                lambda i: summarize_news_article(articles[i].get("title", ""), articles[i].get("summary", "")),
+                missing
+            )
+            for i, text in zip(missing, fallback):
+                summaries[i] = text
+    return summaries
+
+
 def get_news_for_portfolio(tickers, limit=1):
-    news_dict = {}
-    for ticker in tickers:
+    """
+    Top headlines per ticker, fetched concurrently.
+    The shared Finnhub limiter keeps the fan-out within the API quota.
+    """
+    def fetch(ticker):
         try:
             articles = get_company_news_finnhub(ticker)
             if articles and isinstance(articles[0], dict):
-                top_articles = [a['title'] for a in articles[:limit]]
-                news_dict[ticker] = top_articles
-        except:
-            continue
+                return ticker, [a['title'] for a in articles[:limit]]
+        except Exception:
+            pass
+        return ticker, None
+
+    news_dict = {}
+    if not tickers:
+        return news_dict
+    with ThreadPoolExecutor(max_workers=min(FINNHUB_MAX_CONCURRENCY, len(tickers))) as pool:
+        for ticker, headlines in pool.map(fetch, tickers):
+            if headlines is not None:
+                news_dict[ticker] = headlines
     return news_dict
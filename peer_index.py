@@ -0,0 +1,158 @@
+# peer_index.py
+# Where a company ranks among its S&P 500 sector peers, metric by metric.
+# The index holds one sorted NumPy array per (sector, metric), built once from
+# the universe fundamentals, so each percentile is two binary searches. When
+# fresh `info` arrives for a universe ticker, only that ticker's values are
+# moved inside their arrays; nothing is re-sorted.
+
+import threading
+import time
+import numpy as np
+import pandas as pd
+from market_data import add_refresh_listener, get_ticker_info
+from universe import FUNDAMENTALS_TTL, get_universe_fundamentals, metrics_from_info, update_universe_fundamentals
+from utils import format_number
+
+RANKED_METRICS = ("PE", "Forward PE", "PEG", "ROE", "Gross Margin", "Operating Margin", "Profit Margin", "Debt/Equity")
+PERCENT_METRICS = ("ROE", "Gross Margin", "Operating Margin", "Profit Margin")
+# For these a low rank means cheaper or less leveraged
+LOWER_IS_BETTER = ("PE", "Forward PE", "PEG", "Debt/Equity")
+MIN_PEERS = 5  # Fewer values than this give no meaningful percentile
+
+
+class PeerIndex:
+    """
+    Sorted metric values per sector plus each member's current values.
+    Updates replace a sector's array with a new one rather than changing it in
+    place, so readers never need the lock.
+    """
+
+    def __init__(self, fundamentals):
+        metrics = list(RANKED_METRICS)
+        self.built_at = time.time()
+        self._lock = threading.Lock()
+        self._values = {}
+        for sector, group in fundamentals.groupby("Sector"):
+            table = group[metrics].to_numpy(dtype="float64")
+            for j, metric in enumerate(metrics):
+                column = table[:, j]
+                self._values[(sector, metric)] = np.sort(column[~np.isnan(column)])
+        self._members = dict(zip(
+            fundamentals.index,
+            zip(fundamentals["Sector"], fundamentals[metrics].to_numpy(dtype="float64")),
+        ))
+
+    def sector_of(self, symbol):
+        member = self._members.get(symbol)
+        return member[0] if member else None
+
+    def percentile(self, sector, metric, value):
+        """Mid-rank percentile of `value` among the sector's values (ties count half), or None."""
+        values = self._values.get((sector, metric))
+        if values is None or len(values) < MIN_PEERS or value is None or np.isnan(value):
+            return None
+        below = np.searchsorted(values, value, side="left")
+        through = np.searchsorted(values, value, side="right")
+        return 100 * (below + through) / (2 * len(values))
+
+    def rank(self, sector, metrics):
+        """One row per ranked metric: the value, sector median, percentile and peer count."""
+        rows = []
+        for metric in RANKED_METRICS:
+            values = self._values.get((sector, metric), np.empty(0))
+            value = metrics.get(metric)
+            rows.append({
+                "Metric": metric,
+                "Value": value,
+                "Sector Median": float(np.median(values)) if len(values) else np.nan,
+                "Percentile": self.percentile(sector, metric, value),
+                "Peers": len(values),
+            })
+        return pd.DataFrame(rows).astype({"Value": "float64", "Sector Median": "float64", "Percentile": "float64"})
+
+    def update(self, symbol, metrics):
+        """
+        Move a member's values to `metrics` (a Series by metric name), one
+        delete and one insert per changed metric. Returns False for symbols
+        outside the universe.
+        """
+        new = metrics.reindex(list(RANKED_METRICS)).to_numpy(dtype="float64")
+        with self._lock:
+            member = self._members.get(symbol)
+            if member is None:
+                return False
+            sector, old = member
+            for j, metric in enumerate(RANKED_METRICS):
+                if old[j] == new[j] or (np.isnan(old[j]) and np.isnan(new[j])):
+                    continue
+                values = self._values[(sector, metric)]
+                if not np.isnan(old[j]):
+                    values = np.delete(values, np.searchsorted(values, old[j]))
+                if not np.isnan(new[j]):
+                    values = np.insert(values, np.searchsorted(values, new[j]), new[j])
+                self._values[(sector, metric)] = values
+            self._members[symbol] = (sector, new)
+        return True
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_peer_index():
+    """
+    Shared index, rebuilt once it is older than FUNDAMENTALS_TTL.
+    None until the universe fundamentals have been computed; that happens in
+    a background thread, so this never waits on the bulk request.
+    """
+    global _index
+    with _index_lock:
+        if _index is None or time.time() - _index.built_at >= FUNDAMENTALS_TTL:
+            fundamentals = get_universe_fundamentals(background=True)
+            if fundamentals is not None:
+                _index = PeerIndex(fundamentals)
+                print(f"[PEERS] Index built over {len(fundamentals)} tickers")
+        return _index
+
+
+def _on_info_refresh(symbol, info):
+    # Persist first, so a later rebuild from the store keeps the refresh
+    metrics = update_universe_fundamentals(symbol, info)
+    index = _index
+    if metrics is not None and index is not None:
+        index.update(symbol, metrics)
+
+
+add_refresh_listener(_on_info_refresh)
+
+
+def rank_company(ticker):
+    """
+    Rank a ticker's fundamentals within its sector (the universe's sector for
+    members, Yahoo's otherwise). Returns a DataFrame with one row per metric,
+    or None while there is no index or the sector is not covered.
+    """
+    index = get_peer_index()
+    if index is None:
+        return None
+    symbol = ticker.strip().upper()
+    info = get_ticker_info(symbol, groups=("profile", "market"))
+    sector = index.sector_of(symbol) or info.get("sector")
+    ranks = index.rank(sector, metrics_from_info(info))
+    if ranks["Peers"].max() < MIN_PEERS:
+        return None
+    return ranks
+
+
+def format_peer_ranks(ranks):
+    """Presentation copy of the rank table."""
+    def value(metric, x):
+        if pd.isna(x):
+            return "N/A"
+        return format_number(float(x), style="percent" if metric in PERCENT_METRICS else "ratio")
+
+    formatted = ranks.copy()
+    for column in ("Value", "Sector Median"):
+        formatted[column] = [value(m, x) for m, x in zip(ranks["Metric"], ranks[column])]
+    formatted["Percentile"] = ranks["Percentile"].map(lambda p: "N/A" if pd.isna(p) else f"{p:.0f}")
+    return formatted
@@ -1,53 +1,97 @@
 import pandas as pd
 from gpt_summary import generate_ai_portfolio_summary
-from portfolio_utils import fetch_portfolio_data
-from finance_utils import get_stocks_by_risk_profile
+from finance_utils import get_stocks_by_risk_profile, get_risk_universe
+from market_data import fetch_info_batch
 from news_utils import get_news_for_portfolio
+from portfolio_optimizer import optimize_portfolio, TARGET_VOLATILITY
+from price_history import get_close_matrix
+from risk_engine import build_returns
 from utils import format_number
 
+OPTIMIZATION_PERIOD = "3y"  # Daily history behind the covariance and return estimates
+
+
+def _optimized_weights(risk, method, num_stocks):
+    """
+    Optimize over the whole beta bucket for the risk level.
+    Returns (weights, frontier, point), or None when there is too little price data.
+    """
+    universe = get_risk_universe(risk)
+    if len(universe) < 2:
+        return None
+
+    returns, excluded = build_returns(get_close_matrix(universe, OPTIMIZATION_PERIOD))
+    if returns.shape[1] < 2 or len(returns) < 2:
+        return None
+    if excluded:
+        print(f"[OPTIMIZER] Not enough history for {len(excluded)} tickers: {excluded}")
+
+    infos, _, _ = fetch_info_batch(returns.columns)
+    sectors = [infos.get(ticker, {}).get("sector") or "Unknown" for ticker in returns.columns]
+    return optimize_portfolio(returns, sectors, method, TARGET_VOLATILITY.get(risk), max_names=num_stocks)
+
+
 def build_ai_portfolio(capital, preferences):
+    """
+    Build a portfolio for the user's capital and preferences.
+    preferences["optimization"] picks the weighting: "equal" (random names from the
+    risk bucket, equal weights) or an optimizer method ("min_variance",
+    "max_sharpe", "target_risk") solved over the whole bucket.
+    Returns (df, summary, details); details holds the numeric weights and,
+    for optimized portfolios, the efficient frontier and the chosen point on it.
+    """
     risk = preferences["risk_level"]
     num_stocks = preferences.get("num_stocks")
     sectors = preferences.get("sectors", [])
     countries = preferences.get("countries", [])
+    method = preferences.get("optimization", "equal")
 
-    # Use dynamic stock selection based on risk and desired number of stocks
-    # If num_stocks is None, default to 10
-    tickers = get_stocks_by_risk_profile(risk, limit=num_stocks or 10)
+    details = {"method": method, "weights": pd.Series(dtype="float64"), "frontier": None, "point": None}
 
-    # If no tickers were returned, stop and show message
-    if not tickers:
-        return pd.DataFrame(), "No tickers available for this risk level."
+    optimized = _optimized_weights(risk, method, num_stocks or 10) if method != "equal" else None
+    if optimized is not None:
+        weights, details["frontier"], details["point"] = optimized
+    else:
+        if method != "equal":
+            print(f"[OPTIMIZER] Not enough price data for {method}, using equal weights")
+            details["method"] = "equal"
 
-    # Calculate equal allocation for each selected stock
-    allocation = 1 / len(tickers)
-    results = []
+        # Use dynamic stock selection based on risk and desired number of stocks
+        # If num_stocks is None, default to 10
+        tickers = get_stocks_by_risk_profile(risk, limit=num_stocks or 10)
+        # Calculate equal allocation for each selected stock
+        weights = pd.Series(1 / len(tickers), index=tickers) if tickers else pd.Series(dtype="float64")
+
+    # If no tickers were returned, stop and show message
+    if weights.empty:
+        return pd.DataFrame(), "No tickers available for this risk level.", details
 
-    for ticker in tickers:
-        data = fetch_portfolio_data(ticker)
-        if not isinstance(data, dict):
-            continue
+    infos, _, _ = fetch_info_batch(weights.index)
+    weights = weights[weights.index.isin(list(infos))]
+    details["weights"] = weights / weights.sum()
 
+    results = []
+    for ticker, allocation in details["weights"].items():
+        info = infos[ticker]
         invested = round(capital * allocation, 2)
         results.append({
             "Ticker": ticker,
-            "Company": data.get("Name", "N/A"),
-            "Sector": data.get("Sector", "N/A"),
-            "Country": data.get("Country", "USA"),
-            "Allocation %": format_number(allocation, style="percent"),
+            "Company": info.get("longName") or info.get("shortName", "N/A"),
+            "Sector": info.get("sector", "N/A"),
+            "Country": info.get("country", "USA"),
+            "Allocation %": format_number(float(allocation), style="percent"),
             "Investment (USD)": format_number(invested, style="usd"),
-            "PE": format_number(data.get("PE"), style="ratio"),
-            "ROE": format_number(data.get("ROE"), style="percent"),
-            "Beta": format_number(data.get("Beta"), style="ratio"),
+            "PE": format_number(info.get("trailingPE"), style="ratio"),
+            "ROE": format_number(info.get("returnOnEquity"), style="percent"),
+            "Beta": format_number(info.get("beta"), style="ratio"),
         })
 
     df = pd.DataFrame(results)
 
     # Get recent news for the selected tickers
-    news_dict = get_news_for_portfolio(tickers)
+    news_dict = get_news_for_portfolio(list(details["weights"].index))
 
     # Generate GPT summary using portfolio and preferences
     summary = generate_ai_portfolio_summary(df, capital, risk, sectors, countries, news_dict)
 
-    return df, summary
-
+    return df, summary, details
@@ -1,75 +1,110 @@
-from portfolio_utils import fetch_portfolio_data
+import numpy as np
 import pandas as pd
+from market_data import fetch_info_batch
 from utils import format_number
 
+# Portfolio column -> Yahoo `info` key
+TEXT_FIELDS = {
+    "Country": "country",
+    "Sector": "sector",
+    "Industry": "industry",
+}
+NUMERIC_FIELDS = {
+    "PE": "trailingPE",
+    "PB": "priceToBook",
+    "ROE": "returnOnEquity",
+    "Beta": "beta",
+    "Debt/Equity": "debtToEquity",
+}
+
+COLUMNS = ["Company", "Ticker", "Country", "Sector", "Industry", "PE", "PB", "ROE", "Beta", "Debt/Equity", "Weight"]
+
+# Display style per numeric column, used only when rendering
+COLUMN_STYLES = {
+    "PE": "ratio",
+    "PB": "ratio",
+    "ROE": "percent",
+    "Beta": "ratio",
+    "Debt/Equity": "percent",
+    "Weight": "percent",
+}
+
+# Summary label -> (source column, display style)
+SUMMARY_FIELDS = {
+    "PE (weighted avg)": ("PE", "ratio"),
+    "PB (weighted avg)": ("PB", "ratio"),
+    "ROE (weighted avg)": ("ROE", "percent"),
+    "Beta (weighted avg)": ("Beta", "ratio"),
+    "Debt/Equity (avg)": ("Debt/Equity", "percent"),
+}
+
+
+def _weighted_averages(df):
+    """
+    Weighted mean of every summary column in one pass. A missing value drops out
+    of both numerator and denominator, so it does not drag the average to zero.
+    """
+    columns = [column for column, _ in SUMMARY_FIELDS.values()]
+    values = df[columns].to_numpy(dtype="float64")
+    weights = df["Weight"].to_numpy(dtype="float64")
+    present = ~np.isnan(values)
+
+    covered = weights @ present
+    with np.errstate(invalid="ignore", divide="ignore"):
+        averages = (weights @ np.where(present, values, 0.0)) / covered
+    averages[covered == 0] = np.nan
+
+    return {label: float(avg) for label, avg in zip(SUMMARY_FIELDS, averages)}
+
+
 def analyze_portfolio(ticker_list, allocations=None):
     """
     Analyze a portfolio of stocks.
+    Returns (df, summary): numeric columns are float64 with NaN for missing values,
+    and summary holds the weighted averages as floats. Use format_portfolio_table
+    and format_portfolio_summary for display.
     """
-    portfolio_summary = {
-        "Company": [],
-        "Ticker": [],
-        "Country": [],
-        "Sector": [],
-        "Industry": [],
-        "PE": [],
-        "PB": [],
-        "ROE": [],
-        "Beta": [],
-        "Debt/Equity": [],
-        "Weight": []
-    }
-
     if allocations is None:
         allocations = [1 / len(ticker_list)] * len(ticker_list)
 
-    for ticker, weight in zip(ticker_list, allocations):
-        data = fetch_portfolio_data(ticker)
-        if not isinstance(data, dict):
-            continue  # Skip if data fetch failed or malformed
-
-        portfolio_summary["Company"].append(data.get("Name", "N/A"))
-        portfolio_summary["Ticker"].append(ticker)
-        portfolio_summary["Country"].append(data.get("Country", "N/A"))
-        portfolio_summary["Sector"].append(data.get("Sector", "N/A"))
-        portfolio_summary["Industry"].append(data.get("Industry", "N/A"))
-        portfolio_summary["PE"].append(data.get("PE", 0))
-        portfolio_summary["PB"].append(data.get("PB", 0))
-        portfolio_summary["ROE"].append(data.get("ROE", 0))
-        portfolio_summary["Beta"].append(data.get("Beta", 0))
-        portfolio_summary["Debt/Equity"].append(data.get("Debt/Equity", 0) / 100)
-        portfolio_summary["Weight"].append(weight)
-    
-    df = pd.DataFrame(portfolio_summary)
-    df["Weight"] = df["Weight"].astype(float)
-
-    # Calculate weighted averages
-    weighted_summary = {
-        "PE (weighted avg)": (df["PE"] * df["Weight"]).sum(),
-        "PB (weighted avg)": (df["PB"] * df["Weight"]).sum(),
-        "ROE (weighted avg)": (df["ROE"] * df["Weight"]).sum(),
-        "Beta (weighted avg)": (df["Beta"] * df["Weight"]).sum(),
-        "Debt/Equity (avg)": (df["Debt/Equity"] * df["Weight"]).sum()
-    }
-
-    # Format DataFrame columns
-    df["PE"] = df["PE"].apply(lambda x: format_number(x, style="ratio"))
-    df["PB"] = df["PB"].apply(lambda x: format_number(x, style="ratio"))
-    df["ROE"] = df["ROE"].apply(lambda x: format_number(x, style="percent"))
-    df["Beta"] = df["Beta"].apply(lambda x: format_number(x, style="ratio"))
-    df["Debt/Equity"] = df["Debt/Equity"].apply(lambda x: format_number(x, style="percent"))
-    df["Weight"] = df["Weight"].apply(lambda x: format_number(x, style="percent"))
-
-    # Format weighted averages
-    formatted_summary = {
-        "PE (weighted avg)": format_number(weighted_summary["PE (weighted avg)"], style="ratio"),
-        "PB (weighted avg)": format_number(weighted_summary["PB (weighted avg)"], style="ratio"),
-        "ROE (weighted avg)": format_number(weighted_summary["ROE (weighted avg)"], style="percent"),
-        "Beta (weighted avg)": format_number(weighted_summary["Beta (weighted avg)"], style="ratio"),
-        "Debt/Equity (avg)": format_number(weighted_summary["Debt/Equity (avg)"], style="percent")
-    }
-
-    # Reorder columns for display
-    df = df[["Company", "Ticker","Country", "Sector", "Industry", "PE", "PB", "ROE", "Beta", "Debt/Equity", "Weight"]]
-
-    return df, formatted_summary
+    tickers = pd.Series([t.strip().upper() for t in ticker_list], dtype="object")
+    weights = pd.Series(allocations, dtype="float64")
+
+    infos, failures, stats = fetch_info_batch(tickers)
+    if failures:
+        print(f"[PORTFOLIO] Skipped {len(failures)} tickers: {failures}")
+
+    found = tickers.isin(list(infos)).to_numpy()
+    tickers, weights = tickers[found].reset_index(drop=True), weights[found].reset_index(drop=True)
+    raw = pd.DataFrame.from_records([infos[t] for t in tickers], index=tickers.index)
+
+    def column(key):
+        return raw[key] if key in raw else pd.Series(np.nan, index=raw.index)
+
+    df = pd.DataFrame(index=tickers.index)
+    df["Company"] = column("longName").fillna(column("shortName")).fillna("N/A")
+    df["Ticker"] = tickers
+    for name, key in TEXT_FIELDS.items():
+        df[name] = column(key).fillna("N/A")
+    for name, key in NUMERIC_FIELDS.items():
+        df[name] = pd.to_numeric(column(key), errors="coerce").astype("float64")
+    df["Debt/Equity"] = df["Debt/Equity"] / 100  # Yahoo reports D/E in percent
+    df["Weight"] = weights
+
+    return df[COLUMNS], _weighted_averages(df)
+
+
+def _format_value(value, style):
+    return format_number(None if pd.isna(value) else float(value), style=style)
+
+
+def format_portfolio_table(df):
+    """Presentation copy of an analyze_portfolio frame, with numbers as display strings."""
+    view = df.copy()
+    for name, style in COLUMN_STYLES.items():
+        view[name] = view[name].map(lambda x: _format_value(x, style))
+    return view
+
+
+def format_portfolio_summary(summary):
+    return {label: _format_value(summary[label], style) for label, (_, style) in SUMMARY_FIELDS.items()}
@@ -0,0 +1,248 @@
+# portfolio_optimizer.py
+# Long-only mean-variance optimization with per-name and per-sector caps.
+# The whole efficient frontier is solved at once: each row of a weight matrix
+# is one risk-aversion level, and every step is a matrix operation over the
+# batch, so a 500-name universe solves in a fraction of a second.
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+RISK_FREE_RATE = 0.04  # Annual, used for the Sharpe ratio
+RETURN_SHRINKAGE = 0.5  # Pull historical mean returns halfway to the cross-sectional mean
+FRONTIER_POINTS = 30
+MAX_ITERATIONS = 400
+TOLERANCE = 1e-7
+BISECTION_STEPS = 24
+MAX_NAME_WEIGHT = 0.10
+MAX_SECTOR_WEIGHT = 0.35
+MIN_WEIGHT = 1e-4  # Smaller weights are treated as zero
+
+OPTIMIZATION_METHODS = {
+    "equal": "Equal weight",
+    "min_variance": "Minimum variance",
+    "max_sharpe": "Maximum Sharpe",
+    "target_risk": "Target risk",
+}
+
+# Annualized volatility aimed for by the target-risk method
+TARGET_VOLATILITY = {"Low": 0.12, "Medium": 0.18, "High": 0.25}
+
+
+def ledoit_wolf(returns):
+    """
+    Ledoit-Wolf shrinkage of the sample covariance toward a scaled identity.
+    `returns` is a (days x names) array; returns (covariance, shrinkage intensity).
+    """
+    t, n = returns.shape
+    x = returns - returns.mean(axis=0)
+    sample = x.T @ x / t
+    mu = np.trace(sample) / n
+
+    # Distance of the sample from the target, and the sampling noise in the sample
+    delta = ((sample - mu * np.eye(n)) ** 2).sum() / n
+    row_norms = (x ** 2).sum(axis=1)
+    beta = ((row_norms ** 2).sum() / t - (sample ** 2).sum()) / (n * t)
+    shrinkage = min(beta, delta) / delta if delta > 0 else 1.0
+
+    covariance = shrinkage * mu * np.eye(n) + (1 - shrinkage) * sample
+    return covariance, shrinkage
+
+
+def expected_returns(returns, shrinkage=RETURN_SHRINKAGE):
+    """Annualized mean returns shrunk toward their cross-sectional mean."""
+    means = returns.mean(axis=0) * TRADING_DAYS
+    return (1 - shrinkage) * means + shrinkage * means.mean()
+
+
+def _clipped(points, thresholds, cap):
+    return np.minimum(np.maximum(points - thresholds, 0.0), cap)
+
+
+def _spread_gap(weights, gap, eligible, starts, counts, cap):
+    """Add each sector's gap evenly to its eligible names that sit strictly inside (0, cap)."""
+    free = eligible & (weights > 0) & (weights < cap)
+    free_counts = np.add.reduceat(free, starts, axis=1)
+    return weights + free * np.repeat(gap / np.maximum(free_counts, 1), counts, axis=1)
+
+
+def project_capped_simplex(points, cap, starts=None, sector_caps=None):
+    """
+    Euclidean projection of every row of `points` onto
+    {w : sum w = 1, 0 <= w <= cap, sum of each sector <= its cap}.
+    Columns must be grouped by sector, each sector beginning at an index in `starts`.
+
+    The solution is w = clip(v - tau - lambda_sector, 0, cap). tau comes from a
+    vectorized bisection on the fully-invested condition, counting a sector that
+    would overshoot its cap as exactly its cap. The multipliers lambda of those
+    sectors then come from a second bisection on their own sums.
+    """
+    m, n = points.shape
+    if starts is None:
+        starts, sector_caps = np.array([0]), np.array([np.inf])
+    counts = np.diff(np.append(starts, n))
+
+    low = points.min(axis=1, keepdims=True) - cap
+    high = points.max(axis=1, keepdims=True)
+    for _ in range(BISECTION_STEPS):
+        tau = (low + high) / 2
+        sums = np.add.reduceat(_clipped(points, tau, cap), starts, axis=1)
+        over = np.minimum(sums, sector_caps).sum(axis=1, keepdims=True) > 1
+        low = np.where(over, tau, low)
+        high = np.where(over, high, tau)
+
+    tau = np.broadcast_to(high, (m, len(starts)))
+    sums = np.add.reduceat(_clipped(points, high, cap), starts, axis=1)
+    capped = sums > sector_caps
+
+    thresholds = tau
+    if capped.any():
+        sector_low = tau.copy()
+        sector_high = np.broadcast_to(points.max(axis=1, keepdims=True), tau.shape).copy()
+        for _ in range(BISECTION_STEPS):
+            theta = (sector_low + sector_high) / 2
+            sums = np.add.reduceat(_clipped(points, np.repeat(theta, counts, axis=1), cap), starts, axis=1)
+            over = sums > sector_caps
+            sector_low = np.where(over, theta, sector_low)
+            sector_high = np.where(over, sector_high, theta)
+        thresholds = np.where(capped, sector_high, tau)
+
+    weights = _clipped(points, np.repeat(thresholds, counts, axis=1), cap)
+
+    # Bisection leaves a tiny shortfall; close it on names not pinned at a bound
+    sums = np.add.reduceat(weights, starts, axis=1)
+    weights = _spread_gap(weights, np.where(capped, sector_caps - sums, 0.0), True, starts, counts, cap)
+    open_sectors = np.repeat(~capped, counts, axis=1)
+    gap = (1 - weights.sum(axis=1, keepdims=True)) * np.ones(len(starts))
+    free_total = np.add.reduceat(open_sectors & (weights > 0) & (weights < cap), starts, axis=1)
+    share = np.where(free_total.sum(axis=1, keepdims=True) > 0, free_total / np.maximum(free_total.sum(axis=1, keepdims=True), 1), 0.0)
+    weights = _spread_gap(weights, gap * share, open_sectors, starts, counts, cap)
+    return np.minimum(np.maximum(weights, 0.0), cap)
+
+
+def _largest_eigenvalue(matrix, iterations=50):
+    vector = np.full(len(matrix), 1 / np.sqrt(len(matrix)))
+    for _ in range(iterations):
+        vector = matrix @ vector
+        vector /= np.linalg.norm(vector)
+    return float(vector @ matrix @ vector)
+
+
+def solve_frontier(covariance, mu, alphas, cap, starts=None, sector_caps=None):
+    """
+    Minimize w'Cw - alpha * mu'w for every alpha at once, long-only with per-name
+    and per-sector caps, by accelerated projected gradient (FISTA with adaptive
+    restart). Returns a (len(alphas) x names) weight matrix.
+    """
+    m, n = len(alphas), len(mu)
+    step = 1 / (2 * _largest_eigenvalue(covariance))
+    alpha_mu = alphas[:, None] * mu[None, :]
+
+    weights = project_capped_simplex(np.full((m, n), 1 / n), cap, starts, sector_caps)
+    momentum = weights.copy()
+    t = np.ones((m, 1))
+
+    for _ in range(MAX_ITERATIONS):
+        gradient = 2 * momentum @ covariance - alpha_mu
+        updated = project_capped_simplex(momentum - step * gradient, cap, starts, sector_caps)
+
+        # Restart the momentum for rows where it points uphill
+        restart = ((momentum - updated) * (updated - weights)).sum(axis=1, keepdims=True) > 0
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        momentum = updated + np.where(restart, 0.0, (t - 1) / t_next) * (updated - weights)
+        t = np.where(restart, 1.0, t_next)
+
+        change = np.abs(updated - weights).max()
+        weights = updated
+        if change < TOLERANCE:
+            break
+
+    return weights
+
+
+def _sector_layout(sectors, name_cap, sector_cap):
+    """
+    Column order that groups names by sector, the start of each sector in that
+    order, and caps loosened where they cannot add up to a fully invested portfolio.
+    """
+    n = len(sectors)
+    name_cap = max(name_cap, min(2 / n, 1.0))  # Leave room to tilt away from equal weight
+    _, codes = np.unique(np.asarray(sectors, dtype=str), return_inverse=True)
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    counts = np.diff(np.append(starts, n))
+
+    # Each sector can hold at most its cap or the sum of its name caps
+    if np.minimum(counts * name_cap, sector_cap).sum() < 1:
+        sector_cap = 1.0  # Too few sectors for the cap; name caps still apply
+    return order, starts, name_cap, np.full(len(starts), sector_cap)
+
+
+def efficient_frontier(returns, sectors, name_cap=MAX_NAME_WEIGHT, sector_cap=MAX_SECTOR_WEIGHT, points=FRONTIER_POINTS):
+    """
+    Solve the capped long-only efficient frontier for a returns matrix.
+    `returns` is a DataFrame (days x tickers) of daily simple returns and
+    `sectors` a matching sequence of sector labels.
+    Returns (frontier, weights): frontier has one row per point with the
+    annualized return, volatility and Sharpe ratio; weights is a DataFrame with
+    the same rows and one column per ticker. Row 0 is the minimum-variance point.
+    """
+    order, starts, name_cap, sector_caps = _sector_layout(list(sectors), name_cap, sector_cap)
+    r = returns.to_numpy(dtype="float64")[:, order]
+    covariance, _ = ledoit_wolf(r)
+    covariance *= TRADING_DAYS
+    mu = expected_returns(r)
+
+    # Risk-aversion grid from pure minimum variance to nearly pure return-seeking
+    scale = 2 * np.diag(covariance).mean() / max(np.abs(mu).max(), 1e-12)
+    alphas = np.concatenate([[0.0], np.geomspace(1e-3, 1e1, points - 1) * scale])
+
+    weights = solve_frontier(covariance, mu, alphas, name_cap, starts, sector_caps)
+
+    expected = weights @ mu
+    volatility = np.sqrt(np.einsum("ij,jk,ik->i", weights, covariance, weights))
+    frontier = pd.DataFrame({
+        "Return": expected,
+        "Volatility": volatility,
+        "Sharpe": (expected - RISK_FREE_RATE) / volatility,
+    })
+    weights = pd.DataFrame(weights, columns=returns.columns[order])
+    return frontier, weights[returns.columns]
+
+
+def pick_frontier_point(frontier, method, target_volatility=None):
+    """Row of the frontier that a method selects."""
+    if method == "min_variance":
+        return int(frontier["Volatility"].idxmin())
+    if method == "max_sharpe":
+        return int(frontier["Sharpe"].idxmax())
+    if method == "target_risk":
+        # Highest return without exceeding the target; the safest point if none qualifies
+        within = frontier[frontier["Volatility"] <= target_volatility]
+        if within.empty:
+            return int(frontier["Volatility"].idxmin())
+        return int(within["Return"].idxmax())
+    raise ValueError(f"Unknown optimization method: {method}")
+
+
+def optimize_portfolio(returns, sectors, method, target_volatility=None, max_names=None):
+    """
+    Weights for one optimization method, as a Series indexed by ticker.
+    With max_names, the frontier is solved again over the largest holdings.
+    Returns (weights, frontier, point): the frontier behind the final weights
+    and the row that was picked from it.
+    """
+    sectors = pd.Series(list(sectors), index=returns.columns)
+    frontier, weights = efficient_frontier(returns, sectors)
+    point = pick_frontier_point(frontier, method, target_volatility)
+    chosen = weights.iloc[point]
+
+    if max_names and (chosen > MIN_WEIGHT).sum() > max_names:
+        keep = chosen.nlargest(max_names).index
+        frontier, weights = efficient_frontier(returns[keep], sectors[keep])
+        point = pick_frontier_point(frontier, method, target_volatility)
+        chosen = weights.iloc[point]
+
+    chosen = chosen[chosen > MIN_WEIGHT]
+    return chosen / chosen.sum(), frontier, point
@@ -1,9 +1,18 @@
 
 # -*- coding: utf-8 -*-
 
-import yfinance as yf
-from yahooquery import search
+import re
+from concurrent.futures import ThreadPoolExecutor
+from yahooquery import search, Ticker as YahooTicker
 from gpt_summary import generate_gpt_portfolio_insight
+from monte_carlo import simulate_portfolio
+from price_history import get_close_matrix
+from risk_engine import build_returns
+from ticker_search import resolve_local, match_company_name
+from upstream_scheduler import call
+
+# Entries shaped like a ticker (AAPL, BRK-B, CIB, 7203.T) get a bulk quote check
+_SYMBOL_LIKE = re.compile(r"^[A-Z0-9^][A-Z0-9.\-=^]{0,11}$")
 
 
 # Validate tickers and weights
@@ -18,28 +27,6 @@ def validate_portfolio_inputs(tickers, weights):
         return False, "Weights must sum to approximately 1.0 (100%)."
     return True, "Inputs are valid."
 
-# Fetch basic financial info for each ticker
-def fetch_portfolio_data(ticker):
-    try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-
-        return {
-            "Name": info.get("longName") or info.get("shortName", "N/A"),
-            "Ticker": ticker.upper(),
-            "Country": info.get("country", "N/A"),
-            "Sector": info.get("sector", "N/A"),
-            "Industry": info.get("industry", "N/A"),
-            "PE": info.get("trailingPE", 0),
-            "PB": info.get("priceToBook", 0),
-            "ROE": info.get("returnOnEquity", 0),
-            "Beta": info.get("beta", 0),
-            "Debt/Equity": info.get("debtToEquity", 0)
-           
-        }
-    except Exception as e:
-        return None
-
     # generates GPT Insights based on user portfolio
 def generate_portfolio_insight(df):
     return generate_gpt_portfolio_insight(df)
@@ -53,27 +40,79 @@ def get_portfolio_sector_weights(df):
 
 
 
+def project_portfolio(weights, capital, years, method, period="5y"):
+    """Monte Carlo projection of `capital` at `weights` (Series by ticker), or None without price history."""
+    returns, _ = build_returns(get_close_matrix(list(weights.index), period))
+    if returns.shape[1] == 0 or len(returns) < 2:
+        return None
+    return simulate_portfolio(returns, weights, capital, years=years, method=method)
+
+
 def resolve_to_ticker(name_or_symbol):
     """
     Resolve user input (ticker or company name) into a valid stock ticker.
     """
-    name_or_symbol = name_or_symbol.strip().upper()
+    resolved, _ = resolve_tickers([name_or_symbol])
+    return resolved[0] if resolved else None
 
-    # Try if it's a valid ticker directly
-    try:
-        stock = yf.Ticker(name_or_symbol)
-        if stock.info.get("shortName"):
-            return name_or_symbol
-    except:
-        pass
 
-    # Try searching by company name
+def _search_symbol(name):
     try:
-        result = search(name_or_symbol)
+        result = call("yahoo", search, name, key=("search", name.lower()))
         if result.get("quotes"):
             return result["quotes"][0]["symbol"]
-    except:
+    except Exception:
         pass
-
     return None
 
+
+def resolve_tickers(entries, max_workers=8):
+    """
+    Resolve many tickers or company names in one call.
+    Exact tickers and full company names from tickers.csv are taken as is;
+    other symbol-like entries are validated with a single bulk quote request.
+    Free-text names use the local index only for a uniquely best name match,
+    and whatever remains is searched by name concurrently.
+    Returns (resolved, unresolved), both in input order.
+    """
+    cleaned = [entry.strip() for entry in entries if entry and entry.strip()]
+    matches = {}
+
+    # 1. Exact hits in the local universe
+    for entry in cleaned:
+        local_match = resolve_local(entry)
+        if local_match:
+            matches[entry] = local_match
+
+    # 2. One bulk quote request for everything else that looks like a symbol
+    symbol_like = {e for e in cleaned if _SYMBOL_LIKE.match(e.upper())}
+    candidates = {e.upper() for e in symbol_like if e not in matches}
+    if candidates:
+        try:
+            quotes = call("yahoo", lambda: YahooTicker(sorted(candidates)).quotes)
+        except Exception:
+            quotes = {}
+        if isinstance(quotes, dict):
+            for entry in cleaned:
+                quote = quotes.get(entry.upper())
+                if entry not in matches and isinstance(quote, dict) and (quote.get("shortName") or quote.get("longName")):
+                    matches[entry] = entry.upper()
+
+    # 3. Free-text names with one clearly best local match
+    for entry in cleaned:
+        if entry not in matches and entry not in symbol_like:
+            local_match = match_company_name(entry)
+            if local_match:
+                matches[entry] = local_match
+
+    # 4. Concurrent name searches for the rest
+    pending = list(dict.fromkeys(e for e in cleaned if e not in matches))
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as pool:
+            for entry, symbol in zip(pending, pool.map(_search_symbol, pending)):
+                if symbol:
+                    matches[entry] = symbol
+
+    resolved = [matches[e] for e in cleaned if e in matches]
+    unresolved = [e for e in cleaned if e not in matches]
+    return resolved, unresolved
@@ -0,0 +1,222 @@
+# price_history.py
+# Local columnar OHLCV store with delta fetching.
+# Each (ticker, interval) series lives in one Parquet file; Yahoo is only
+# asked for bars newer than the last stored one, and every requested
+# period is served by slicing the local frame.
+
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from data_store import DATA_DIR, read_price_history_meta, write_price_history_meta
+from upstream_scheduler import call
+
+PRICE_DIR = os.path.join(DATA_DIR, "prices")
+
+# Minimum gap between delta fetches for the same series
+DELTA_REFRESH_SECONDS = 900
+
+# How far back each yfinance period label reaches ("max" and "ytd" are special-cased)
+PERIOD_OFFSETS = {
+    "1d": pd.DateOffset(days=7),  # Last session only; a week covers weekends and holidays
+    "5d": pd.DateOffset(days=7),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+_series_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _period_start(period):
+    """UTC timestamp where a period begins, or None for the full history."""
+    now = pd.Timestamp.now(tz="UTC")
+    if period == "max":
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=now.year, month=1, day=1, tz="UTC")
+    return (now - PERIOD_OFFSETS[period]).normalize()
+
+
+def _series_path(ticker, interval):
+    return os.path.join(PRICE_DIR, f"{ticker}_{interval}.parquet")
+
+
+def _read_series(path):
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+
+def _write_series(path, frame):
+    # Write then rename so readers in other processes never see a partial file
+    os.makedirs(PRICE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    frame.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _series_lock(ticker, interval):
+    with _locks_guard:
+        return _series_locks.setdefault((ticker, interval), threading.Lock())
+
+
+def _fetch_history(symbol, since, interval):
+    """Bars from `since` (YYYY-MM-DD) onward, or the full history when since is None."""
+    if since is None:
+        return yf.Ticker(symbol).history(period="max", interval=interval)
+    return yf.Ticker(symbol).history(start=since, interval=interval)
+
+
+def get_price_history(ticker, period="1y", interval="1d"):
+    """
+    Return OHLCV bars for a ticker over a yfinance-style period ("1mo", "5y", "ytd", "max", ...).
+    The first request for a range downloads it once; later requests only fetch
+    bars after the last stored timestamp, at most every DELTA_REFRESH_SECONDS.
+    """
+    symbol = ticker.strip().upper()
+    start = _period_start(period)
+    path = _series_path(symbol, interval)
+
+    with _series_lock(symbol, interval):
+        meta = read_price_history_meta(symbol, interval)
+        frame = _read_series(path) if meta else None
+        now = time.time()
+
+        covered = (
+            frame is not None
+            and not frame.empty
+            and (meta[0] is None or (start is not None and start.timestamp() >= meta[0]))
+        )
+
+        if not covered:
+            # Range reaches further back than what is stored: download it in full
+            since = start.strftime("%Y-%m-%d") if start is not None else None
+            frame = call("yahoo", _fetch_history, symbol, since, interval, key=("history", symbol, interval, since))
+            if frame.empty:
+                return frame
+            _write_series(path, frame)
+            write_price_history_meta(symbol, interval, start.timestamp() if start is not None else None, now)
+
+        elif now - meta[1] >= DELTA_REFRESH_SECONDS:
+            # Re-request from the last stored bar so a still-forming bar gets replaced
+            last_bar = frame.index[-1]
+            since = last_bar.strftime("%Y-%m-%d")
+            delta = call("yahoo", _fetch_history, symbol, since, interval, key=("history", symbol, interval, since))
+            if not delta.empty:
+                frame = pd.concat([frame[frame.index < delta.index[0]], delta])
+                _write_series(path, frame)
+            write_price_history_meta(symbol, interval, meta[0], now)
+
+    if period == "1d":
+        # Every bar of the latest session: one daily bar, or that day's intraday bars
+        return frame[frame.index.normalize() == frame.index[-1].normalize()]
+    if start is None:
+        return frame
+    return frame[frame.index >= start]
+
+
+# ========== One fetch per render ==========
+
+# Chart range selector -> period fetched as daily bars
+CHART_RANGES = {
+    "1M": "1mo",
+    "6M": "6mo",
+    "1Y": "1y",
+    "5Y": "5y",
+    "YTD": "ytd",
+    "MAX": "max",
+}
+DEFAULT_TIME_RANGE = "1Y"
+CHART_MAX_POINTS = 800  # About the width in pixels of the page's chart area
+
+
+def get_price_series(ticker, time_range):
+    """
+    Return the daily frame that covers everything one analysis render needs:
+    the closing price, the Plotly chart and the exported chart image.
+    """
+    period = CHART_RANGES.get(time_range, CHART_RANGES[DEFAULT_TIME_RANGE])
+    return get_price_history(ticker, period)
+
+
+def latest_close(frame):
+    if frame is None or frame.empty or "Close" not in frame.columns:
+        return None
+    return frame["Close"].iloc[-1]
+
+
+def downsample_bars(frame, max_points=CHART_MAX_POINTS):
+    """
+    At most `max_points` bars for drawing a close-price line, by min/max
+    bucketing: the bars are split into max_points / 2 equal buckets and each
+    keeps the bars with its lowest and highest close, so peaks and troughs
+    survive. The first and last bars are always kept.
+    """
+    if "Close" not in frame.columns:
+        return frame
+    frame = frame[frame["Close"].notna()]
+    n = len(frame)
+    if n <= max_points:
+        return frame
+
+    size = -(-n // max(max_points // 2 - 1, 1))  # Leave room for the first and last bar
+    buckets = -(-n // size)
+    closes = np.full(buckets * size, np.nan)
+    closes[:n] = frame["Close"].to_numpy(dtype="float64")
+    closes = closes.reshape(buckets, size)
+
+    offsets = np.arange(buckets) * size
+    keep = np.unique(np.concatenate([
+        [0, n - 1], offsets + np.nanargmin(closes, axis=1), offsets + np.nanargmax(closes, axis=1),
+    ]))
+    return frame.iloc[keep]
+
+
+# ========== Multi-ticker closes ==========
+
+# Bulk close matrices are kept briefly in memory; they back portfolio analytics,
+# not the per-ticker Parquet store
+CLOSE_CACHE_SIZE = 32
+_close_cache = {}
+_close_cache_lock = threading.Lock()
+
+
+def _download_closes(symbols, period):
+    data = yf.download(list(symbols), period=period, interval="1d", auto_adjust=True, progress=False, threads=True)
+    closes = data["Close"]
+    if isinstance(closes, pd.Series):  # yfinance returns a Series for a single ticker
+        closes = closes.to_frame(symbols[0])
+    return closes
+
+
+def get_close_matrix(tickers, period="1y"):
+    """
+    Daily adjusted closes for many tickers from one bulk download.
+    Returns a frame indexed by date with one column per ticker; dates where a
+    ticker did not trade are NaN. Results are reused for DELTA_REFRESH_SECONDS.
+    """
+    symbols = tuple(sorted({t.strip().upper() for t in tickers if t and t.strip()}))
+    if not symbols:
+        return pd.DataFrame()
+
+    cache_key = (symbols, period)
+    with _close_cache_lock:
+        cached = _close_cache.get(cache_key)
+    if cached is not None and time.time() - cached[1] < DELTA_REFRESH_SECONDS:
+        return cached[0]
+
+    closes = call("yahoo", _download_closes, symbols, period, key=("closes",) + cache_key)
+    closes = closes.reindex(columns=list(symbols)).sort_index()
+    with _close_cache_lock:
+        _close_cache[cache_key] = (closes, time.time())
+        if len(_close_cache) > CLOSE_CACHE_SIZE:
+            _close_cache.pop(next(iter(_close_cache)))  # Oldest entry
+    return closes
@@ -0,0 +1,33 @@
+# report_cache.py
+# Analysis-page report export. The chart PNG and the .docx bytes are built
+# only when a report is requested, and cached per ticker, range and data
+# fingerprint so reruns and repeat downloads reuse them.
+
+import hashlib
+import json
+import pandas as pd
+import streamlit as st
+from docx_exporter import CHART_MAX_POINTS, build_report
+from price_history import downsample_bars
+
+REPORT_CACHE_ENTRIES = 32
+
+
+def report_fingerprint(chart_data, **report):
+    """Digest of everything that goes into a report: the charted closes and the report fields."""
+    digest = hashlib.sha256()
+    if "Close" in chart_data.columns:
+        digest.update(pd.util.hash_pandas_object(chart_data["Close"]).to_numpy().tobytes())
+    digest.update(json.dumps(report, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+@st.cache_data(max_entries=REPORT_CACHE_ENTRIES, show_spinner=False)
+def build_report_files(ticker, time_range, fingerprint, _chart_data, _chart_title, _report):
+    """
+    (PNG bytes or None, DOCX bytes) for one report.
+    Cached on (ticker, time_range, fingerprint); the underscored arguments are
+    what the fingerprint was computed from, so they are not hashed again.
+    """
+    # No more points than the image is pixels wide
+    return build_report(ticker, downsample_bars(_chart_data, max_points=CHART_MAX_POINTS), _chart_title, _report)
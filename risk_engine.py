@@ -0,0 +1,193 @@
+# risk_engine.py
+# Portfolio risk analytics on an aligned (days x holdings) daily returns matrix.
+# Everything is computed with NumPy matrix operations, so portfolios with
+# hundreds of holdings and ten years of daily history stay interactive.
+
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from price_history import get_close_matrix
+from utils import format_number
+
+TRADING_DAYS = 252
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_WINDOW = 63  # About three months of trading days
+RISK_PERIODS = ["1y", "3y", "5y", "10y"]
+
+MIN_COVERAGE = 0.9  # Holdings priced on fewer days than this share of the period are left out
+FILL_LIMIT = 5  # Carry a close across at most this many missing days (foreign market holidays)
+
+
+def build_returns(closes, min_coverage=MIN_COVERAGE):
+    """
+    Turn a close matrix into a dense matrix of simple daily returns.
+    Returns (returns, excluded): returns has no NaN; excluded lists tickers
+    whose history is too short to align with the rest.
+    """
+    closes = closes.dropna(how="all")
+    coverage = closes.notna().mean()
+    excluded = coverage.index[coverage < min_coverage].tolist()
+    closes = closes.drop(columns=excluded).ffill(limit=FILL_LIMIT)
+
+    values = closes.to_numpy(dtype="float64")
+    returns = pd.DataFrame(values[1:] / values[:-1] - 1, index=closes.index[1:], columns=closes.columns)
+    return returns.dropna(how="any"), excluded
+
+
+def historical_var(returns, confidence=DEFAULT_CONFIDENCE):
+    """Historical VaR and CVaR for each column (or the last axis of windows), as positive losses."""
+    cutoff = np.quantile(returns, 1 - confidence, axis=0, keepdims=True)
+    tail = returns <= cutoff
+    cvar = (returns * tail).sum(axis=0) / tail.sum(axis=0)
+    return -cutoff[0], -cvar
+
+
+def parametric_var(mean, std, confidence=DEFAULT_CONFIDENCE):
+    """Gaussian VaR and CVaR from daily mean and standard deviation, as positive losses."""
+    normal = NormalDist()
+    z = normal.inv_cdf(1 - confidence)
+    var = -(mean + z * std)
+    cvar = -(mean - std * normal.pdf(z) / (1 - confidence))
+    return var, cvar
+
+
+def max_drawdown(returns):
+    """Largest peak-to-trough loss of each column, as a positive fraction."""
+    log_wealth = np.cumsum(np.log1p(returns), axis=0)
+    peaks = np.maximum(np.maximum.accumulate(log_wealth, axis=0), 0.0)  # Starting value is a peak too
+    return 1 - np.exp(-(peaks - log_wealth).max(axis=0))
+
+
+def rolling_moments(returns, window):
+    """
+    Rolling mean and sample standard deviation along axis 0 from cumulative sums,
+    so the cost is the same for any window length.
+    """
+    center = returns.mean(axis=0)
+    x = returns - center  # Centering keeps the running sums well conditioned
+    zeros = np.zeros((1,) + x.shape[1:])
+    s1 = np.cumsum(np.concatenate([zeros, x]), axis=0)
+    s2 = np.cumsum(np.concatenate([zeros, x * x]), axis=0)
+    s1 = s1[window:] - s1[:-window]
+    s2 = s2[window:] - s2[:-window]
+
+    mean = s1 / window
+    var = np.maximum(s2 - s1 * mean, 0.0) / (window - 1)
+    return mean + center, np.sqrt(var)
+
+
+def _rolling_drawdown(returns, window):
+    """Max drawdown inside each trailing window of a single return series."""
+    log_wealth = np.concatenate([[0.0], np.cumsum(np.log1p(returns))])
+    windows = sliding_window_view(log_wealth, window + 1)
+    peaks = np.maximum.accumulate(windows, axis=1)
+    return 1 - np.exp(-(peaks - windows).max(axis=1))
+
+
+def _rolling_metrics(portfolio_returns, holding_returns, weights, window, confidence):
+    mean, std = rolling_moments(portfolio_returns, window)
+    var, cvar = historical_var(sliding_window_view(portfolio_returns, window).T, confidence)
+    param_var, _ = parametric_var(mean, std, confidence)
+
+    # Average pairwise correlation implied by portfolio and holding volatilities:
+    # sigma_p^2 = sum (w_i s_i)^2 + rho * [(sum w_i s_i)^2 - sum (w_i s_i)^2]
+    _, holding_std = rolling_moments(holding_returns, window)
+    scaled = holding_std * weights
+    own = (scaled ** 2).sum(axis=1)
+    cross = scaled.sum(axis=1) ** 2 - own
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_corr = np.where(cross > 0, (std ** 2 - own) / cross, np.nan)
+
+    return pd.DataFrame({
+        "Volatility": std * np.sqrt(TRADING_DAYS),
+        "VaR": var,
+        "CVaR": cvar,
+        "VaR (parametric)": param_var,
+        "Max Drawdown": _rolling_drawdown(portfolio_returns, window),
+        "Avg Correlation": avg_corr,
+    })
+
+
+def analyze_portfolio_risk(tickers, weights=None, period="1y", confidence=DEFAULT_CONFIDENCE, window=DEFAULT_WINDOW):
+    """
+    Risk profile of a portfolio from one bulk daily-close download.
+    Weights are held constant (daily rebalanced) and renormalized over the
+    holdings with enough history. VaR/CVaR are one-day losses at `confidence`.
+    Returns None when there is not enough price data, else a dict with
+    "portfolio" (scalar metrics), "holdings", "covariance" and "correlation"
+    (annualized), "rolling" (trailing `window`-day metrics) and "excluded".
+    """
+    symbols = [t.strip().upper() for t in tickers]
+    if weights is None:
+        weights = [1 / len(symbols)] * len(symbols)
+    weights = pd.Series(weights, index=symbols, dtype="float64").groupby(level=0).sum()
+
+    closes = get_close_matrix(symbols, period)
+    if closes.empty:
+        return None
+    returns, excluded = build_returns(closes)
+    if returns.shape[1] == 0 or len(returns) < 2:
+        return None
+
+    w = weights.reindex(returns.columns).to_numpy()
+    w = w / w.sum()
+    r = returns.to_numpy()
+    portfolio_returns = r @ w
+
+    centered = r - r.mean(axis=0)
+    cov = centered.T @ centered / (len(r) - 1)
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = cov / np.outer(std, std)
+
+    portfolio_variance = w @ cov @ w
+    portfolio_std = np.sqrt(portfolio_variance)
+    var, cvar = historical_var(portfolio_returns[:, None], confidence)
+    param_var, param_cvar = parametric_var(portfolio_returns.mean(), portfolio_std, confidence)
+    holding_var, holding_cvar = historical_var(r, confidence)
+
+    holdings = pd.DataFrame({
+        "Weight": w,
+        "Volatility": std * np.sqrt(TRADING_DAYS),
+        "VaR": holding_var,
+        "CVaR": holding_cvar,
+        "Max Drawdown": max_drawdown(r),
+        # Share of portfolio variance each holding is responsible for
+        "Risk Contribution": w * (cov @ w) / portfolio_variance if portfolio_variance > 0 else np.nan,
+    }, index=returns.columns)
+
+    portfolio = {
+        "Volatility": float(portfolio_std * np.sqrt(TRADING_DAYS)),
+        "VaR": float(var[0]),
+        "CVaR": float(cvar[0]),
+        "VaR (parametric)": float(param_var),
+        "CVaR (parametric)": float(param_cvar),
+        "Max Drawdown": float(max_drawdown(portfolio_returns)),
+    }
+
+    rolling = pd.DataFrame()
+    if len(r) > window:
+        rolling = _rolling_metrics(portfolio_returns, r, w, window, confidence)
+        rolling.index = returns.index[window - 1:]
+
+    return {
+        "portfolio": portfolio,
+        "holdings": holdings,
+        "covariance": pd.DataFrame(cov * TRADING_DAYS, index=returns.columns, columns=returns.columns),
+        "correlation": pd.DataFrame(corr, index=returns.columns, columns=returns.columns),
+        "rolling": rolling,
+        "excluded": excluded,
+        "observations": len(r),
+        "confidence": confidence,
+        "window": window,
+    }
+
+
+def format_risk_summary(portfolio):
+    return {label: format_number(value, style="percent") for label, value in portfolio.items()}
+
+
+def format_risk_table(holdings):
+    """Presentation copy of the per-holding risk table."""
+    return holdings.apply(lambda column: column.map(lambda x: format_number(None if pd.isna(x) else float(x), style="percent")))
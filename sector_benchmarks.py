@@ -1,61 +0,0 @@
-
-# Hard coded for now. Update to be dynamic in the future.
-
-sector_benchmarks = {
-    "Technology": {
-        "PE": 25,
-        "ROE": 0.18,
-        "DebtEquity": 0.6,
-        "GrossMargin": 0.55,
-        "OperatingMargin": 0.22
-    },
-    "Healthcare": {
-        "PE": 20,
-        "ROE": 0.16,
-        "DebtEquity": 0.7,
-        "GrossMargin": 0.60,
-        "OperatingMargin": 0.20
-    },
-    "Financials": {
-        "PE": 12,
-        "ROE": 0.12,
-        "DebtEquity": 1.5,
-        "GrossMargin": 0.45,
-        "OperatingMargin": 0.30
-    },
-    "Consumer Staples": {
-        "PE": 20,
-        "ROE": 0.15,
-        "DebtEquity": 0.8,
-        "GrossMargin": 0.35,
-        "OperatingMargin": 0.18
-    },
-    "Consumer Discretionary": {
-        "PE": 22,
-        "ROE": 0.14,
-        "DebtEquity": 1.0,
-        "GrossMargin": 0.40,
-        "OperatingMargin": 0.15
-    },
-    "Energy": {
-        "PE": 10,
-        "ROE": 0.14,
-        "DebtEquity": 0.9,
-        "GrossMargin": 0.35,
-        "OperatingMargin": 0.18
-    },
-    "Industrials": {
-        "PE": 18,
-        "ROE": 0.12,
-        "DebtEquity": 1.2,
-        "GrossMargin": 0.30,
-        "OperatingMargin": 0.12
-    },
-    "Utilities": {
-        "PE": 17,
-        "ROE": 0.09,
-        "DebtEquity": 1.4,
-        "GrossMargin": 0.40,
-        "OperatingMargin": 0.20
-    }
-}
@@ -0,0 +1,197 @@
+# ticker_search.py
+# In-memory search index over tickers.csv, built once per process.
+# Supports exact, prefix, substring and typo-tolerant (trigram) matching.
+
+import functools
+import os
+import re
+import pandas as pd
+
+TICKERS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tickers.csv")
+
+# Relevance of each kind of match; fuzzy matches score below all of these
+SCORE_EXACT_SYMBOL = 100
+SCORE_EXACT_NAME = 90
+SCORE_SYMBOL_PREFIX = 80
+SCORE_NAME_PREFIX = 70
+SCORE_WORD_PREFIX = 60
+SCORE_NAME_SUBSTRING = 50
+SCORE_GICS_MATCH = 40
+FUZZY_MAX_SCORE = 30
+FUZZY_MIN_SIMILARITY = 0.35
+
+_NON_WORD = re.compile(r"[^a-z0-9& ]+")
+
+
+def _normalize(text):
+    return _NON_WORD.sub(" ", str(text).lower()).strip()
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TickerIndex:
+    """Read-only lookup tables over the ticker universe."""
+
+    def __init__(self, df):
+        df = df.fillna("")
+        # Yahoo writes share classes with a dash (BRK-B), the CSV with a dot (BRK.B)
+        self.symbols = [s.replace(".", "-") for s in df["Symbol"].astype(str)]
+        self.names = df["Security"].astype(str).tolist()
+        self.sectors = df["GICS Sector"].astype(str).tolist()
+        self.sub_industries = df["GICS Sub-Industry"].astype(str).tolist()
+
+        self.symbols_lower = [s.lower() for s in self.symbols]
+        self.names_lower = [_normalize(n) for n in self.names]
+        self.name_words = [n.split() for n in self.names_lower]
+
+        # Few distinct GICS labels, so match against those instead of every row
+        self.gics_positions = {}
+        for position, labels in enumerate(zip(self.sectors, self.sub_industries)):
+            for label in filter(None, labels):
+                self.gics_positions.setdefault(label.lower(), []).append(position)
+
+        self.by_symbol = {}
+        for position, symbol in enumerate(self.symbols_lower):
+            self.by_symbol[symbol] = position
+            self.by_symbol[symbol.replace("-", ".")] = position
+
+        self.trigram_postings = {}
+        self.trigram_counts = []
+        for position, name in enumerate(self.names_lower):
+            grams = _trigrams(name)
+            self.trigram_counts.append(len(grams))
+            for gram in grams:
+                self.trigram_postings.setdefault(gram, []).append(position)
+
+    def _name_candidates(self, query_norm):
+        """Positions whose name could contain the query, narrowed by the trigram postings."""
+        if len(query_norm) < 3:
+            return range(len(self.names_lower))
+        postings = [self.trigram_postings.get(query_norm[i:i + 3], ()) for i in range(len(query_norm) - 2)]
+        candidates = set(min(postings, key=len))
+        for posting in postings:
+            candidates.intersection_update(posting)
+        return candidates
+
+    def _name_score(self, position, query_norm):
+        name = self.names_lower[position]
+        if name == query_norm:
+            return SCORE_EXACT_NAME
+        if name.startswith(query_norm):
+            return SCORE_NAME_PREFIX
+        if any(word.startswith(query_norm) for word in self.name_words[position]):
+            return SCORE_WORD_PREFIX
+        if query_norm in name:
+            return SCORE_NAME_SUBSTRING
+        return 0
+
+    def _fuzzy(self, query_norm, exclude):
+        """Trigram (Jaccard) similarity against company names, for typos."""
+        grams = _trigrams(query_norm)
+        shared = {}
+        for gram in grams:
+            for position in self.trigram_postings.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+
+        scored = []
+        for position, overlap in shared.items():
+            if position in exclude:
+                continue
+            similarity = overlap / (len(grams) + self.trigram_counts[position] - overlap)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                scored.append((FUZZY_MAX_SCORE * similarity, position))
+        return scored
+
+    def search(self, query, limit=5):
+        """Return up to `limit` (score, position) pairs, best match first."""
+        query = query.strip().lower()
+        query_norm = _normalize(query)
+        if not query_norm:
+            return []
+
+        best = {}
+
+        def keep(position, score):
+            if score > best.get(position, 0):
+                best[position] = score
+
+        exact = self.by_symbol.get(query)
+        if exact is not None:
+            keep(exact, SCORE_EXACT_SYMBOL)
+
+        for position, symbol in enumerate(self.symbols_lower):
+            if symbol.startswith(query):
+                keep(position, SCORE_SYMBOL_PREFIX)
+
+        for position in self._name_candidates(query_norm):
+            score = self._name_score(position, query_norm)
+            if score:
+                keep(position, score)
+
+        for label, positions in self.gics_positions.items():
+            if query_norm in label:
+                for position in positions:
+                    keep(position, SCORE_GICS_MATCH)
+
+        scored = [(score, position) for position, score in best.items()]
+        if len(scored) < limit:
+            scored.extend(self._fuzzy(query_norm, {position for _, position in scored}))
+
+        # Best score first, then shorter (more specific) names
+        scored.sort(key=lambda item: (-item[0], len(self.names[item[1]]), self.names[item[1]]))
+        return scored[:limit]
+
+
+@functools.lru_cache(maxsize=1)
+def get_ticker_index():
+    return TickerIndex(pd.read_csv(TICKERS_CSV))
+
+
+@functools.lru_cache(maxsize=2048)
+def _cached_search(query, limit):
+    index = get_ticker_index()
+    return tuple(
+        (index.names[position], index.symbols[position], score)
+        for score, position in index.search(query, limit)
+    )
+
+
+def search_tickers(query, limit=5):
+    """
+    Rank companies in tickers.csv against a name, ticker or GICS term.
+    Returns a list of [Security, Symbol] pairs, best match first.
+    """
+    return [[name, symbol] for name, symbol, _ in _cached_search(query.strip().lower(), limit)]
+
+
+def resolve_local(query):
+    """
+    Return the symbol for an exact local hit (ticker or full company name),
+    or None so the caller can validate or search over the network. Prefix
+    hits are not enough: ING or VALE are valid tickers outside tickers.csv.
+    """
+    matches = _cached_search(query.strip().lower(), 2)
+    if not matches or matches[0][2] < SCORE_EXACT_NAME:
+        return None
+    # Two companies with the same full name are ambiguous
+    if len(matches) > 1 and matches[1][2] == matches[0][2] == SCORE_EXACT_NAME:
+        return None
+    return matches[0][1]
+
+
+def match_company_name(query):
+    """
+    Return the symbol whose company name matches free text (exact, prefix,
+    word prefix or substring) when no other company matches as well; None
+    otherwise. Meant for names, not ticker-shaped input.
+    """
+    matches = _cached_search(query.strip().lower(), 2)
+    name_scores = (SCORE_EXACT_NAME, SCORE_NAME_PREFIX, SCORE_WORD_PREFIX, SCORE_NAME_SUBSTRING)
+    if not matches or matches[0][2] not in name_scores:
+        return None
+    if len(matches) > 1 and matches[1][2] == matches[0][2]:
+        return None
+    return matches[0][1]
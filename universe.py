@@ -0,0 +1,348 @@
+# universe.py
+# The tickers.csv universe (S&P 500 constituents) and datasets computed over it.
+# Datasets are stored in data_store with the time they were computed, so
+# every session reads the same copy and only a stale one is rebuilt.
+# Run `python universe.py` from a scheduled job to refresh them ahead of time.
+
+import functools
+import threading
+import time
+import pandas as pd
+from yahooquery import Ticker as YahooTicker
+from benchmark_etfs import SP500_SECTOR_WEIGHTS
+from data_store import read_dataset, write_dataset
+from ticker_search import TICKERS_CSV
+from upstream_scheduler import call, BATCH
+
+# tickers.csv uses GICS sector names; Yahoo's `info` uses its own labels
+GICS_TO_YAHOO_SECTOR = {
+    "Information Technology": "Technology",
+    "Health Care": "Healthcare",
+    "Financials": "Financial Services",
+    "Consumer Discretionary": "Consumer Cyclical",
+    "Consumer Staples": "Consumer Defensive",
+    "Materials": "Basic Materials",
+    "Communication Services": "Communication Services",
+    "Energy": "Energy",
+    "Industrials": "Industrials",
+    "Real Estate": "Real Estate",
+    "Utilities": "Utilities",
+}
+
+SECTOR_WEIGHTS_TTL = 24 * 3600
+MIN_CAP_COVERAGE = 0.5  # Share of the universe that must report a market cap
+FAILED_REFRESH_RETRY = 600
+
+_cache = {}  # dataset name -> (value, computed_at)
+_cache_lock = threading.Lock()
+_refresh_locks = {}
+_failed_at = {}  # dataset name -> time of the last failed refresh
+
+
+@functools.lru_cache(maxsize=1)
+def load_universe():
+    """Universe as a DataFrame: Symbol (Yahoo form), Security, GICS Sector and Yahoo Sector."""
+    df = pd.read_csv(TICKERS_CSV).fillna("")
+    return pd.DataFrame({
+        "Symbol": df["Symbol"].astype(str).str.replace(".", "-", regex=False),
+        "Security": df["Security"].astype(str),
+        "GICS Sector": df["GICS Sector"].astype(str),
+        "Sector": df["GICS Sector"].map(GICS_TO_YAHOO_SECTOR).fillna(df["GICS Sector"]).astype(str),
+    })
+
+
+def _fetch_quotes(symbols):
+    return YahooTicker(list(symbols)).quotes
+
+
+def fetch_market_caps(symbols, priority=BATCH):
+    """Market caps for many symbols from one bulk quote request; NaN where Yahoo has none."""
+    symbols = list(symbols)
+    quotes = call("yahoo", _fetch_quotes, tuple(symbols), key=("quotes", tuple(symbols)), priority=priority)
+    if not isinstance(quotes, dict):
+        quotes = {}
+    caps = {symbol: quote.get("marketCap") for symbol, quote in quotes.items() if isinstance(quote, dict)}
+    return pd.to_numeric(pd.Series(caps, dtype="object"), errors="coerce").reindex(symbols).astype("float64")
+
+
+def _refresh_dataset(name, ttl, compute, stored, fallback):
+    """
+    Recompute a dataset under its lock and store it, unless another thread or
+    process already did. If that fails, the stale copy (or `fallback`) is
+    served and no retry happens for FAILED_REFRESH_RETRY seconds.
+    """
+    with _cache_lock:
+        lock = _refresh_locks.setdefault(name, threading.Lock())
+    with lock:
+        current = read_dataset(name)
+        if current is not None and time.time() - current[1] < ttl:
+            with _cache_lock:
+                _cache[name] = current
+            return current[0]
+
+        if time.time() - _failed_at.get(name, 0) >= FAILED_REFRESH_RETRY:
+            try:
+                value = compute()
+                fresh = (value, time.time())
+                write_dataset(name, value, fresh[1])
+                with _cache_lock:
+                    _cache[name] = fresh
+                return value
+            except Exception as e:
+                _failed_at[name] = time.time()
+                print(f"[UNIVERSE] Refreshing {name} failed: {e}")
+
+    value = stored[0] if stored else fallback
+    if value is None:
+        raise RuntimeError(f"Dataset {name} is not available")
+    return value
+
+
+def _start_background_refresh(name, ttl, compute):
+    with _cache_lock:
+        lock = _refresh_locks.setdefault(name, threading.Lock())
+    if lock.locked() or time.time() - _failed_at.get(name, 0) < FAILED_REFRESH_RETRY:
+        return
+    threading.Thread(
+        target=_refresh_dataset, args=(name, ttl, compute, None, {}), name=f"refresh-{name}", daemon=True
+    ).start()
+
+
+def _cached_dataset(name, ttl, compute, fallback=None, background=False):
+    """
+    Return a dataset from memory or the store while it is younger than `ttl`.
+    A stale one is recomputed by one thread at a time, either right away or,
+    with background=True, in a daemon thread while the stale copy (or
+    `fallback` when there is none) is served.
+    """
+    with _cache_lock:
+        cached = _cache.get(name)
+    if cached and time.time() - cached[1] < ttl:
+        return cached[0]
+
+    stored = read_dataset(name)
+    if stored is not None:
+        with _cache_lock:
+            _cache[name] = stored
+        if time.time() - stored[1] < ttl:
+            return stored[0]
+
+    if background:
+        _start_background_refresh(name, ttl, compute)
+        return stored[0] if stored else fallback
+    return _refresh_dataset(name, ttl, compute, stored, fallback)
+
+
+# ========== S&P 500 sector weights ==========
+
+def compute_sector_weights():
+    """Cap-weighted sector weights of the universe in percent, keyed by Yahoo sector."""
+    universe = load_universe()
+    caps = fetch_market_caps(universe["Symbol"])
+    coverage = caps.notna().mean()
+    if coverage < MIN_CAP_COVERAGE:
+        raise ValueError(f"Market caps found for only {coverage:.0%} of the universe")
+
+    totals = caps.groupby(universe["Sector"].to_numpy()).sum()
+    weights = (100 * totals / totals.sum()).round(2).sort_values(ascending=False)
+    print(f"[UNIVERSE] Sector weights from {caps.notna().sum()}/{len(caps)} market caps")
+    return weights.to_dict()
+
+
+def get_sp500_sector_weights():
+    """
+    S&P 500 sector weights in percent as a Series keyed by Yahoo sector name.
+    Recomputed at most every SECTOR_WEIGHTS_TTL; until a computation has
+    succeeded, the static table in benchmark_etfs is used.
+    """
+    weights = _cached_dataset(
+        "sp500_sector_weights", SECTOR_WEIGHTS_TTL, compute_sector_weights, fallback=SP500_SECTOR_WEIGHTS
+    )
+    return pd.Series(weights, dtype="float64")
+
+
+# ========== Universe fundamentals and sector baselines ==========
+
+# Metric -> (yahooquery module, key) in the bulk fundamentals pull.
+# PEG is Yahoo's trailing PEG, the figure yfinance reports as trailingPegRatio;
+# it is not in any module and comes from the valuation timeseries instead.
+FUNDAMENTAL_FIELDS = {
+    "PE": ("summaryDetail", "trailingPE"),
+    "Forward PE": ("summaryDetail", "forwardPE"),
+    "PB": ("defaultKeyStatistics", "priceToBook"),
+    "PEG": None,
+    "ROE": ("financialData", "returnOnEquity"),
+    "Debt/Equity": ("financialData", "debtToEquity"),
+    "Gross Margin": ("financialData", "grossMargins"),
+    "Operating Margin": ("financialData", "operatingMargins"),
+    "Profit Margin": ("financialData", "profitMargins"),
+}
+# The same metrics under their yfinance `info` keys
+INFO_FIELDS = {
+    "PE": "trailingPE",
+    "Forward PE": "forwardPE",
+    "PB": "priceToBook",
+    "PEG": "trailingPegRatio",
+    "ROE": "returnOnEquity",
+    "Debt/Equity": "debtToEquity",
+    "Gross Margin": "grossMargins",
+    "Operating Margin": "operatingMargins",
+    "Profit Margin": "profitMargins",
+}
+# Multiples that mean nothing when negative (losses, negative book value)
+POSITIVE_ONLY = ("PE", "Forward PE", "PB", "PEG")
+FUNDAMENTALS_TTL = 24 * 3600
+BASELINES_TTL = 24 * 3600
+
+
+def _fetch_modules(symbols):
+    modules = sorted({field[0] for field in FUNDAMENTAL_FIELDS.values() if field})
+    return YahooTicker(list(symbols)).get_modules(modules)
+
+
+def _fetch_peg_series(symbols):
+    return YahooTicker(list(symbols)).get_financial_data(["PegRatio"], frequency="q", trailing=True)
+
+
+def fetch_trailing_peg(symbols, priority=BATCH):
+    """Latest trailing (TTM) PEG per symbol from one bulk timeseries request; NaN where Yahoo has none."""
+    symbols = list(symbols)
+    frame = call("yahoo", _fetch_peg_series, tuple(symbols), key=("trailing_peg", tuple(symbols)), priority=priority)
+    if not isinstance(frame, pd.DataFrame) or "PegRatio" not in frame.columns:
+        return pd.Series(float("nan"), index=symbols, dtype="float64")
+    frame = frame.reset_index()
+    trailing = frame[(frame["periodType"] == "TTM") & frame["PegRatio"].notna()].sort_values("asOfDate")
+    return trailing.groupby("symbol")["PegRatio"].last().reindex(symbols).astype("float64")
+
+
+def compute_universe_fundamentals():
+    """
+    Fundamentals for the whole universe from one bulk request.
+    Returns {symbol: {"Sector": ..., metric: value or None}}.
+    """
+    universe = load_universe()
+    symbols = tuple(universe["Symbol"])
+    modules = call("yahoo", _fetch_modules, symbols, key=("modules", symbols), priority=BATCH)
+    if not isinstance(modules, dict):
+        raise ValueError("Bulk fundamentals request returned no data")
+
+    pegs = fetch_trailing_peg(symbols)
+
+    rows = {}
+    for symbol, sector in zip(universe["Symbol"], universe["Sector"]):
+        payload = modules.get(symbol)
+        payload = payload if isinstance(payload, dict) else {}
+        rows[symbol] = {"Sector": sector}
+        for metric, field in FUNDAMENTAL_FIELDS.items():
+            section = payload.get(field[0]) if field else None
+            rows[symbol][metric] = section.get(field[1]) if isinstance(section, dict) else None
+        rows[symbol]["PEG"] = None if pd.isna(pegs[symbol]) else float(pegs[symbol])
+
+    covered = sum(any(row[m] is not None for m in FUNDAMENTAL_FIELDS) for row in rows.values())
+    if covered < MIN_CAP_COVERAGE * len(rows):
+        raise ValueError(f"Fundamentals found for only {covered}/{len(rows)} tickers")
+    print(f"[UNIVERSE] Fundamentals for {covered}/{len(rows)} tickers")
+    return rows
+
+
+def fundamentals_frame(rows):
+    """Universe fundamentals as a DataFrame indexed by symbol, metrics as float64 with NaN."""
+    df = pd.DataFrame.from_dict(rows, orient="index")
+    metrics = df.reindex(columns=list(FUNDAMENTAL_FIELDS)).apply(pd.to_numeric, errors="coerce").astype("float64")
+    metrics["Debt/Equity"] = metrics["Debt/Equity"] / 100  # Yahoo reports D/E in percent
+    positive = list(POSITIVE_ONLY)
+    metrics[positive] = metrics[positive].where(metrics[positive] > 0)
+    metrics.insert(0, "Sector", df["Sector"])
+    return metrics
+
+
+def metrics_from_info(info):
+    """One ticker's metrics from a yfinance `info` dict, cleaned the same way as the universe pull."""
+    row = {metric: info.get(key) for metric, key in INFO_FIELDS.items()}
+    row["Sector"] = info.get("sector")
+    return fundamentals_frame({"row": row}).iloc[0]
+
+
+def get_universe_fundamentals(background=False):
+    """
+    Universe fundamentals as a DataFrame, refreshed at most every FUNDAMENTALS_TTL.
+    With background=True a missing or stale copy is rebuilt in a daemon thread
+    and None is returned while there is no copy at all.
+    """
+    rows = _cached_dataset(
+        "universe_fundamentals", FUNDAMENTALS_TTL, compute_universe_fundamentals, background=background
+    )
+    return fundamentals_frame(rows) if rows else None
+
+
+def update_universe_fundamentals(symbol, info):
+    """
+    Fold fresh yfinance `info` for one universe ticker into the stored
+    fundamentals, keeping the dataset's computed_at, so the next read (and
+    anything rebuilt from it) includes the refresh. Skipped while the dataset
+    is being recomputed. Returns the ticker's cleaned metrics, or None when
+    nothing was updated.
+    """
+    name = "universe_fundamentals"
+    with _cache_lock:
+        lock = _refresh_locks.setdefault(name, threading.Lock())
+    if not lock.acquire(blocking=False):
+        return None  # A full refresh is about to replace the dataset anyway
+    try:
+        stored = read_dataset(name)
+        if stored is None or symbol not in stored[0]:
+            return None
+        rows, computed_at = stored
+        row = {metric: info.get(key) for metric, key in INFO_FIELDS.items()}
+        row["Sector"] = rows[symbol]["Sector"]  # The universe's sector, not Yahoo's label for this ticker
+        rows[symbol] = row
+        write_dataset(name, rows, computed_at)
+        with _cache_lock:
+            _cache[name] = (rows, computed_at)
+    finally:
+        lock.release()
+    return fundamentals_frame({symbol: row}).iloc[0]
+
+
+def compute_sector_baselines(fundamentals=None):
+    """
+    Median and interquartile range of every metric per sector, from one groupby.
+    Returns {sector: {"count": n, metric: {"median", "q1", "q3"}}}.
+    """
+    df = fundamentals if fundamentals is not None else get_universe_fundamentals()
+    metrics = list(FUNDAMENTAL_FIELDS)
+    quantiles = df.groupby("Sector")[metrics].quantile([0.25, 0.5, 0.75])  # (sector, q) x metric
+    counts = df.groupby("Sector").size()
+
+    baselines = {}
+    for sector, count in counts.items():
+        table = quantiles.loc[sector]
+        baselines[sector] = {"count": int(count)}
+        for metric in metrics:
+            q1, median, q3 = (None if pd.isna(v) else float(v) for v in table[metric])
+            baselines[sector][metric] = {"median": median, "q1": q1, "q3": q3}
+    return baselines
+
+
+def get_sector_baseline(sector):
+    """
+    Stored baseline for a Yahoo sector name, or None when there is none yet.
+    Never waits on the network: a stale copy is served while a background
+    thread rebuilds it.
+    """
+    baselines = _cached_dataset("sector_baselines", BASELINES_TTL, compute_sector_baselines, fallback={}, background=True)
+    return baselines.get(sector)
+
+
+def refresh_all():
+    """Recompute every universe dataset now, whatever its age."""
+    write_dataset("sp500_sector_weights", compute_sector_weights())
+    fundamentals = compute_universe_fundamentals()
+    write_dataset("universe_fundamentals", fundamentals)
+    write_dataset("sector_baselines", compute_sector_baselines(fundamentals_frame(fundamentals)))
+    with _cache_lock:
+        _cache.clear()
+
+
+if __name__ == "__main__":
+    refresh_all()
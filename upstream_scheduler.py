@@ -0,0 +1,208 @@
+# upstream_scheduler.py
+# Central scheduler for every call to an upstream provider (Yahoo, Finnhub, OpenAI).
+# Each provider gets its own priority queue, worker pool and rate budget, so
+# batch work (universe screening, bulk exports) cannot starve interactive
+# analysis. Identical requests queued at the same time are coalesced into one.
+
+import heapq
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Priority classes: lower runs first
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Concurrency and rate budget per provider
+PROVIDERS = {
+    "yahoo": {"concurrency": 8, "calls_per_minute": 1200, "burst": 40},
+    "finnhub": {"concurrency": 8, "calls_per_minute": 60, "burst": 10},  # Finnhub free tier quota
+    "openai": {"concurrency": 8, "calls_per_minute": 500, "burst": 20},
+}
+
+# Set ANALYST_SCHEDULER_DEBUG=1 to show live queue metrics in the sidebar
+SCHEDULER_DEBUG = os.environ.get("ANALYST_SCHEDULER_DEBUG") == "1"
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate_per_minute` sustained, up to `burst` at once."""
+
+    def __init__(self, rate_per_minute, burst):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class _Job:
+    def __init__(self, priority, key, fn, args, kwargs):
+        self.priority = priority
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.started = False
+
+
+class ProviderQueue:
+    """Priority queue plus a fixed pool of worker threads for one provider."""
+
+    def __init__(self, name, concurrency, calls_per_minute, burst):
+        self.name = name
+        self.concurrency = concurrency
+        self.limiter = TokenBucket(calls_per_minute, burst)
+        self.heap = []
+        self.sequence = itertools.count()
+        self.pending = {}  # coalescing key -> queued or running job
+        self.condition = threading.Condition()
+        self.workers = []
+        self.stats = {"submitted": 0, "coalesced": 0, "completed": 0, "failed": 0, "in_flight": 0}
+        self.queued = {priority: 0 for priority in PRIORITY_NAMES}
+
+    def submit(self, fn, args, kwargs, key=None, priority=INTERACTIVE):
+        with self.condition:
+            self.stats["submitted"] += 1
+            job = self.pending.get(key) if key is not None else None
+            if job is not None:
+                self.stats["coalesced"] += 1
+                # An interactive request for work queued as batch pulls it forward
+                if not job.started and priority < job.priority:
+                    self.queued[job.priority] -= 1
+                    self.queued[priority] += 1
+                    job.priority = priority
+                    heapq.heappush(self.heap, (priority, next(self.sequence), job))
+                return job.future
+
+            job = _Job(priority, key, fn, args, kwargs)
+            if key is not None:
+                self.pending[key] = job
+            heapq.heappush(self.heap, (priority, next(self.sequence), job))
+            self.queued[priority] += 1
+            if len(self.workers) < self.concurrency:
+                worker = threading.Thread(target=self._work, name=f"{self.name}-worker-{len(self.workers)}", daemon=True)
+                self.workers.append(worker)
+                worker.start()
+            self.condition.notify()
+            return job.future
+
+    def _next_job(self):
+        with self.condition:
+            while True:
+                while not self.heap:
+                    self.condition.wait()
+                _, _, job = heapq.heappop(self.heap)
+                if job.started:
+                    continue  # Stale heap entry left behind by a priority bump
+                job.started = True
+                self.queued[job.priority] -= 1
+                self.stats["in_flight"] += 1
+                return job
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            self.limiter.acquire()
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+                failed = False
+            except BaseException as e:
+                # Even SystemExit or KeyboardInterrupt from a job must resolve its
+                # future and leave this worker serving the queue
+                result = e
+                failed = True
+
+            with self.condition:
+                self.stats["in_flight"] -= 1
+                self.stats["failed" if failed else "completed"] += 1
+                if job.key is not None and self.pending.get(job.key) is job:
+                    del self.pending[job.key]
+
+            if failed:
+                job.future.set_exception(result)
+            else:
+                job.future.set_result(result)
+
+    def metrics(self):
+        with self.condition:
+            return {
+                "queued": {PRIORITY_NAMES[p]: count for p, count in self.queued.items()},
+                **self.stats,
+            }
+
+
+_queues = {name: ProviderQueue(name, **budget) for name, budget in PROVIDERS.items()}
+
+
+def submit(provider, fn, *args, key=None, priority=INTERACTIVE, **kwargs):
+    """
+    Queue `fn(*args, **kwargs)` against a provider's budget and return a Future.
+    Requests sharing a `key` while one is queued or running get the same Future.
+    `fn` should be a single upstream call; it must not wait on the same provider.
+    """
+    return _queues[provider].submit(fn, args, kwargs, key=key, priority=priority)
+
+
+def call(provider, fn, *args, key=None, priority=INTERACTIVE, **kwargs):
+    """Blocking form of submit()."""
+    return submit(provider, fn, *args, key=key, priority=priority, **kwargs).result()
+
+
+_STREAM_END = object()
+
+
+def call_stream(provider, fn, *args, priority=INTERACTIVE, **kwargs):
+    """
+    Generator form of call() for streamed responses. `fn(*args, **kwargs)`
+    returns an iterable that is read inside the provider's worker, so the
+    concurrency slot is held until the stream is exhausted or the caller stops
+    reading. Items are handed over through a queue as they arrive.
+    """
+    items = queue.Queue()
+    stopped = threading.Event()
+
+    def pump():
+        response = fn(*args, **kwargs)
+        try:
+            for item in response:
+                if stopped.is_set():
+                    break
+                items.put(item)
+        finally:
+            close = getattr(response, "close", None)
+            if close is not None:
+                close()
+
+    future = submit(provider, pump, priority=priority)
+    future.add_done_callback(lambda _: items.put(_STREAM_END))
+    try:
+        while True:
+            item = items.get()
+            if item is _STREAM_END:
+                break
+            yield item
+        future.result()  # Raise what the request or the stream failed with
+    finally:
+        stopped.set()
+
+
+def queue_metrics():
+    """Queue depth by priority, in-flight count and totals for every provider."""
+    return {name: queue.metrics() for name, queue in _queues.items()}
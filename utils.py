@@ -1,29 +1,15 @@
 
 import yfinance as yf
 import streamlit as st
+from market_data import get_ticker_info
+from upstream_scheduler import call
+from formatting import format_number, clean_text
 
 
 
 # ========== Formatting Helpers ==========
 
-def format_number(value, style="usd"):
-    if value is None:
-        return "N/A"
-
-    try:
-        if style == "usd":
-            return f"${round(value, 2):,}" if isinstance(value, (int, float)) else value
-        elif style == "percent":
-            return f"{round(value * 100, 2)}%" if isinstance(value, (int, float)) else value
-        elif style == "ratio":
-            return f"{round(value, 2)}" if isinstance(value, (int, float)) else value
-        else:
-            return str(value)
-    except:
-        return "N/A"
-    # === Clean text of special characters (for GPT or online data) ===
-def clean_text(text):
-    return text.encode("utf-8", "ignore").decode("utf-8", "ignore")
+# format_number and clean_text live in formatting.py, which report workers can import cheaply
 
 # === Remove company suffixes (like Inc., Corp.) for better matching ===
 def clean_company_name(name):
@@ -96,13 +82,12 @@ def render_grouped_metrics(data, closing_price):
 
 def get_logo_url(ticker: str) -> str:
     try:
-        ticker_data = yf.Ticker(ticker)
-        info = ticker_data.info
+        info = get_ticker_info(ticker)
         logo_url = info.get("logo_url", "")
         
         # Fallback to fast_info if needed
         if not logo_url:
-            logo_url = ticker_data.fast_info.get("logo_url", "")
+            logo_url = call("yahoo", lambda: yf.Ticker(ticker).fast_info.get("logo_url", ""))
 
         # If still empty, return a generic placeholder
         if not logo_url:
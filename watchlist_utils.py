@@ -1,4 +1,6 @@
+import pandas as pd
 import streamlit as st
+from batch_export import export_watchlist
 
 def init_watchlist():
     if "watchlist" not in st.session_state:
@@ -39,6 +41,44 @@ def display_watchlist_sidebar():
         st.sidebar.success(f"{st.session_state.watchlist_removed} removed.")
         del st.session_state.watchlist_removed
 
+def _discard_watchlist_archive():
+    archive = st.session_state.pop("watchlist_archive", None)
+    if archive is not None:
+        archive.close()
+
+def _serve(archive):
+    """Download callback: read the spooled ZIP each time the user clicks."""
+    def serve():
+        archive.seek(0)
+        return archive.read()
+    return serve
+
+def display_watchlist_export():
+    """Sidebar button that exports a report for every watchlist ticker as one ZIP."""
+    if st.session_state.watchlist and st.sidebar.button("Export Watchlist Reports", key="export_watchlist"):
+        _discard_watchlist_archive()  # Close the previous export's ZIP
+        export_progress = st.sidebar.progress(0.0, text="Preparing reports...")
+        archive, statuses = export_watchlist(
+            st.session_state.watchlist,
+            progress=lambda done, total, ticker: export_progress.progress(done / total, text=f"{ticker} done ({done}/{total})"),
+        )
+        st.session_state.watchlist_archive = archive
+        st.session_state.watchlist_export_statuses = statuses
+
+    # The ZIP is read only when the download is clicked; it stays open until the next export
+    if "watchlist_archive" in st.session_state:
+        st.sidebar.download_button(
+            label="Download Reports (.zip)",
+            data=_serve(st.session_state.watchlist_archive),
+            file_name="watchlist_reports.zip",
+            mime="application/zip",
+            on_click="ignore",
+        )
+
+    if "watchlist_export_statuses" in st.session_state:
+        statuses = st.session_state.watchlist_export_statuses
+        st.sidebar.dataframe(pd.DataFrame(list(statuses.items()), columns=["Ticker", "Status"]))
+
 def add_to_watchlist_button(final_ticker):
     if not final_ticker:
         return